@@ -1,11 +1,11 @@
-import inspect
-from typing import Optional, Dict, Union, List
-
-import requests
+from contextlib import contextmanager
+from typing import Optional, Dict, Union, List, Iterator
 
+from alpha_vantage.transport import RequestsTransport
 from constants import AlphaVantageFunctions, AlphaVantageValues, ALPHA_VANTAGE_BASE_URL, AlphaVantageKeys
 from helpers.custom_exceptions_helper import InvalidApiKeyException, AlphaVantageApiException
 from helpers.decorators.validation_decorator import validate_interval, validate_result, validate_series_type
+from helpers.profiler import NULL_PROFILER, PhaseProfiler
 
 
 class AlphaVantage(object):
@@ -16,29 +16,59 @@ class AlphaVantage(object):
     _KEYS = AlphaVantageKeys()
     _VALUES = AlphaVantageValues()
 
-    def __init__(self, key: str, output_format='json', output_size='compact'):
+    def __init__(self, key: str, output_format='json', output_size='compact', transport=None,
+                 base_url: Optional[str] = None, validate_key: bool = True, profiler: Optional[PhaseProfiler] = None):
         """ Initialize the class
         :param key:
         :param output_format:
         :param output_size:
+        :param transport: sends the http requests, e.g. `RecordingTransport` or `ReplayTransport`,
+            defaults to the network.
+        :param base_url: defaults to the alpha vantage api, e.g. the url of a local `AlphaVantageProxy`.
+        :param validate_key: check the api key with a request, False saves a request when the key is known to work.
+        :param profiler: times the requests from the start, the api key check included.
         """
         self.output_format = output_format
         self.output_size = output_size
-        self.set_api_key(key)
-
-    def set_api_key(self, api_key: str) -> None:
+        self.base_url = (base_url or self._ALPHA_VANTAGE_BASE_URL).rstrip('/')
+        self.transport = transport or RequestsTransport()
+        self.profiler = profiler or NULL_PROFILER
+        self.set_api_key(key, validate=validate_key)
+
+    @contextmanager
+    def profile(self, cprofile_path: Optional[str] = None) -> Iterator[PhaseProfiler]:
+        """ Time the requests made within the block, per phase (network, decode, validate).
+        Pass the same profiler to other code (e.g. the runner) to time its transform and persist phases too.
+        :param cprofile_path: if provided, also run cProfile over the block and write its stats there.
+        :return: the profiler, `profiler.report()` gives the timings.
+        """
+        previous_profiler = self.profiler
+        self.profiler = profiler = PhaseProfiler(cprofile=bool(cprofile_path))
+        profiler.start()
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+            self.profiler = previous_profiler
+            if cprofile_path:
+                profiler.dump_stats(cprofile_path)
+
+    def set_api_key(self, api_key: str, validate: bool = True) -> None:
         """ Sets the api key, if it is invalid, will raise InvalidApiKeyException.
         :param api_key:
+        :param validate: False sets the key without checking it.
         :raises InvalidApiKeyException:
         :return:
         """
         self.api_key = api_key
+        if not validate:
+            return None
         # test the api key by using the api search
 
-        url = f'{self._ALPHA_VANTAGE_BASE_URL}/query?function={self._FUNCTIONS.SEARCH}&keywords=test' \
+        url = f'{self.base_url}/query?function={self._FUNCTIONS.SEARCH}&keywords=test' \
               f'&apikey={self.api_key}'
-        request = requests.get(url)
-        result = request.json()
+        request = self._request(url)
+        result = self._decode(request)
 
         if self._KEYS.ERR_KEY in result.keys():
             raise InvalidApiKeyException(extra=result[self._KEYS.ERR_KEY])
@@ -53,11 +83,11 @@ class AlphaVantage(object):
         """
         # must force json here, to display in the console each search
         output_format = 'json' if force_json else self.output_format
-        url = f'{self._ALPHA_VANTAGE_BASE_URL}/query?function={self._FUNCTIONS.SEARCH}&keywords={keyword}' \
+        url = f'{self.base_url}/query?function={self._FUNCTIONS.SEARCH}&keywords={keyword}' \
               f'&apikey={self.api_key}&datatype={output_format}'
 
-        request = requests.get(url)
-        result = request.json()
+        request = self._request(url)
+        result = self._decode(request)
 
         if output_format == 'json':
             if self._KEYS.SEARCH_KEY not in result.keys():
@@ -73,7 +103,7 @@ class AlphaVantage(object):
         :return:
         """
         output_format = 'json' if force_json else self.output_format
-        url = f'{self._ALPHA_VANTAGE_BASE_URL}/query?function={self._FUNCTIONS.CURRENT_QOUTE}&symbol={symbol}' \
+        url = f'{self.base_url}/query?function={self._FUNCTIONS.CURRENT_QOUTE}&symbol={symbol}' \
               f'&apikey={self.api_key}&datatype={output_format}'
 
         result = self._get_result_per_output_format(url=url, key=self._KEYS.GLOBAL_QUOTE_KEY,
@@ -94,7 +124,7 @@ class AlphaVantage(object):
         :return:
         """
         output_format = 'json' if force_json else self.output_format
-        url = f'{self._ALPHA_VANTAGE_BASE_URL}/query?function={self._FUNCTIONS.EMA}&symbol={symbol}' \
+        url = f'{self.base_url}/query?function={self._FUNCTIONS.EMA}&symbol={symbol}' \
               f'&interval={interval}&time_period={time_period}&series_type={series_type}&apikey={self.api_key}' \
               f'&datatype={output_format}'
 
@@ -107,18 +137,23 @@ class AlphaVantage(object):
     @validate_interval
     @validate_result
     def get_intraday(self, symbol: str, interval: str, adjusted: Optional[bool] = True,
-                     force_json: bool = False) -> Union[Dict[str, Dict[str, str]], bytes]:
+                     force_json: bool = False, month: Optional[str] = None,
+                     output_size: Optional[str] = None) -> Union[Dict[str, Dict[str, str]], bytes]:
         """ Get intraday time series of the equity specified, covering extended trading hours where applicable.
         :param symbol:
         :param interval:
         :param adjusted:
         :param force_json: must force json here, to display in the console each search
+        :param month: `YYYY-MM`, to get that month of history instead of the most recent data.
+        :param output_size: overrides the client `output_size`, use `full` to get a whole month.
         :return:
         """
         output_format = 'json' if force_json else self.output_format
-        url = f'{self._ALPHA_VANTAGE_BASE_URL}/query?function={self._FUNCTIONS.INTRADAY}&symbol={symbol}' \
+        url = f'{self.base_url}/query?function={self._FUNCTIONS.INTRADAY}&symbol={symbol}' \
               f'&interval={interval}&apikey={self.api_key}&adjusted={str(adjusted).lower()}' \
-              f'&outputsize={self.output_size}&datatype={output_format}'
+              f'&outputsize={output_size or self.output_size}&datatype={output_format}'
+        if month:
+            url += f'&month={month}'
 
         result = self._get_result_per_output_format(url=url, key=f'{self._KEYS.TIME_SERIES_KEY} ({interval})',
                                                     output_format=output_format)
@@ -132,7 +167,7 @@ class AlphaVantage(object):
         :return:
         """
         output_format = 'json' if force_json else self.output_format
-        url = f'{self._ALPHA_VANTAGE_BASE_URL}/query?function={self._FUNCTIONS.DAILY}&symbol={symbol}' \
+        url = f'{self.base_url}/query?function={self._FUNCTIONS.DAILY}&symbol={symbol}' \
               f'&apikey={self.api_key}&datatype={output_format}'
 
         result = self._get_result_per_output_format(url=url, key=f'{self._KEYS.TIME_SERIES_KEY} (Daily)',
@@ -147,7 +182,7 @@ class AlphaVantage(object):
         :return:
         """
         output_format = 'json' if force_json else self.output_format
-        url = f'{self._ALPHA_VANTAGE_BASE_URL}/query?function={self._FUNCTIONS.WEEKLY}&symbol={symbol}' \
+        url = f'{self.base_url}/query?function={self._FUNCTIONS.WEEKLY}&symbol={symbol}' \
               f'&apikey={self.api_key}&datatype={output_format}'
 
         result = self._get_result_per_output_format(url=url, key=f'Weekly {self._KEYS.TIME_SERIES_KEY}',
@@ -162,7 +197,7 @@ class AlphaVantage(object):
         :return:
         """
         output_format = 'json' if force_json else self.output_format
-        url = f'{self._ALPHA_VANTAGE_BASE_URL}/query?function={self._FUNCTIONS.MONTHLY}&symbol={symbol}' \
+        url = f'{self.base_url}/query?function={self._FUNCTIONS.MONTHLY}&symbol={symbol}' \
               f'&apikey={self.api_key}&datatype={output_format}'
 
         result = self._get_result_per_output_format(url=url, key=f'Monthly {self._KEYS.TIME_SERIES_KEY}',
@@ -183,15 +218,32 @@ class AlphaVantage(object):
         result = None
 
         if output_format == 'json':
-            request = requests.get(url)
-            result_json = request.json()
+            request = self._request(url)
+            result_json = self._decode(request)
             if key not in list(result_json.keys()):
+                import inspect
                 caller_func = inspect.stack()[1][3]
                 raise AlphaVantageApiException(extra=f'No result found, could not perform {caller_func}')
             result = result_json[key]
 
         elif output_format == 'csv':
-            request = requests.get(url, allow_redirects=True)
+            request = self._request(url, allow_redirects=True)
             result = request.content
 
         return result
+
+    def _request(self, url: str, **kwargs):
+        """ Send the request through the transport, timed as the `network` phase.
+        :param url:
+        :return:
+        """
+        with self.profiler.phase('network'):
+            return self.transport.get(url, **kwargs)
+
+    def _decode(self, request) -> Dict:
+        """ Parse the json body, timed as the `decode` phase.
+        :param request:
+        :return:
+        """
+        with self.profiler.phase('decode'):
+            return request.json()
@@ -0,0 +1,350 @@
+import csv
+import glob
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from constants import AlphaVantageValues
+from helpers.custom_exceptions_helper import WrongInputValueException
+
+TRADING_PERIODS_PER_YEAR = {'daily': 252, 'weekly': 52, 'monthly': 12}
+REGULAR_SESSION_MINUTES = 390
+
+
+def periods_per_year(interval: str, timestamps: np.ndarray) -> int:
+    """ Number of bars in a year, to annualize the statistics of a series.
+    Intraday bars per session are counted in the series itself: the api covers the extended hours where applicable,
+    and thinly traded symbols miss bars. An empty series falls back on the regular session.
+    :param interval:
+    :param timestamps: datetime64 array
+    :raises WrongInputValueException:
+    :return:
+    """
+    if interval in TRADING_PERIODS_PER_YEAR:
+        return TRADING_PERIODS_PER_YEAR[interval]
+    if interval not in AlphaVantageValues.TIME_INTERVALS_MAP:
+        raise WrongInputValueException(extra=f'`interval` should be one of following: '
+                                             f'{AlphaVantageValues.TIME_INTERVALS_MAP}, {interval} is not accepted.')
+    _, bars_per_session = np.unique(np.asarray(timestamps).astype('datetime64[D]'), return_counts=True)
+    if len(bars_per_session):
+        bars = float(np.median(bars_per_session))
+    else:
+        bars = REGULAR_SESSION_MINUTES / int(interval[:-len('min')])
+    return int(round(bars * TRADING_PERIODS_PER_YEAR['daily']))
+
+
+class StoredSeries(object):
+    """ A parsed timeseries, timestamps are sorted ascending and values has one column per field.
+    """
+
+    def __init__(self, symbol: str, interval: str, timestamps: np.ndarray, values: np.ndarray, columns: List[str]):
+        """ Initialize the class
+        :param symbol:
+        :param interval:
+        :param timestamps: datetime64[s] array
+        :param values: float64 matrix, shape (len(timestamps), len(columns))
+        :param columns:
+        """
+        self.symbol = symbol
+        self.interval = interval
+        self.timestamps = timestamps
+        self.values = values
+        self.columns = columns
+
+    def column(self, name: str) -> np.ndarray:
+        """ Return a single column of the series, e.g. `close`.
+        :param name:
+        :raises WrongInputValueException:
+        :return:
+        """
+        if name not in self.columns:
+            raise WrongInputValueException(extra=f'`column` should be one of following: {self.columns}, '
+                                                 f'{name} is not accepted.')
+        return self.values[:, self.columns.index(name)]
+
+
+def parse_series(payload: Dict[str, Dict[str, str]]) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """ Convert an api result (timestamp -> {'1. open': '...', ...}) into arrays, works for the
+    timeseries apis and for `get_ema` results alike.
+    :param payload:
+    :return: timestamps, values, columns
+    """
+    timestamps = sorted(payload.keys())
+    if not timestamps:
+        return np.empty(0, dtype='datetime64[s]'), np.empty((0, 0)), []
+    keys = sorted(payload[timestamps[0]].keys())
+    columns = [re.sub("^[0-9]+\\. ", "", key).lower() for key in keys]
+    values = np.array([[payload[timestamp][key] for key in keys] for timestamp in timestamps], dtype=np.float64)
+    return np.array(timestamps, dtype='datetime64[s]'), values, columns
+
+
+def _parse_csv(file_name: str) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """ Read a csv file saved from the timeseries apis.
+    :param file_name:
+    :return: timestamps, values, columns
+    """
+    with open(file_name, 'r') as reader_file:
+        reader = csv.reader(reader_file)
+        header = next(reader)
+        rows = sorted(reader)
+    columns = [column.lower() for column in header[1:]]
+    if not rows:
+        return np.empty(0, dtype='datetime64[s]'), np.empty((0, len(columns))), columns
+    timestamps = np.array([row[0] for row in rows], dtype='datetime64[s]')
+    values = np.array([row[1:] for row in rows], dtype=np.float64)
+    return timestamps, values, columns
+
+
+def find_stored_file(output_dest: str, symbol: str, interval: str) -> Optional[str]:
+    """ Find the most recent file saved by the runner for a symbol and interval.
+    Files are named `{symbol}_{interval}_{timestamp}.{json|csv}`.
+    :param output_dest:
+    :param symbol:
+    :param interval:
+    :return: the file path, None if nothing was stored.
+    """
+    candidates = []
+    for extension in ('json', 'csv'):
+        pattern = os.path.join(glob.escape(output_dest), f'{glob.escape(symbol)}_{interval}_*.{extension}')
+        for file_name in glob.glob(pattern):
+            timestamp = os.path.basename(file_name)[len(f'{symbol}_{interval}_'):-len(f'.{extension}')]
+            try:
+                candidates.append((float(timestamp), file_name))
+            except ValueError:
+                continue
+    if not candidates:
+        return None
+    return max(candidates)[1]
+
+
+def list_stored_symbols(output_dest: str, interval: str) -> List[str]:
+    """ List the symbols that have a stored series for the given interval.
+    :param output_dest:
+    :param interval:
+    :return:
+    """
+    symbols = set()
+    for file_name in glob.glob(os.path.join(glob.escape(output_dest), f'*_{interval}_*')):
+        parts = os.path.basename(file_name).rsplit('_', 2)
+        if len(parts) == 3 and parts[1] == interval:
+            symbols.add(parts[0])
+    return sorted(symbols)
+
+
+def load_stored_series(output_dest: str, symbol: str, interval: str) -> StoredSeries:
+    """ Load the most recent stored series of a symbol, never calls the api.
+    :param output_dest:
+    :param symbol:
+    :param interval:
+    :raises FileNotFoundError:
+    :return:
+    """
+    file_name = find_stored_file(output_dest=output_dest, symbol=symbol, interval=interval)
+    if file_name is None:
+        raise FileNotFoundError(f'No stored `{interval}` series for {symbol} in {output_dest}.')
+    if file_name.endswith('.csv'):
+        timestamps, values, columns = _parse_csv(file_name)
+    else:
+        with open(file_name, 'r') as reader_file:
+            timestamps, values, columns = parse_series(json.load(reader_file))
+    return StoredSeries(symbol=symbol, interval=interval, timestamps=timestamps, values=values, columns=columns)
+
+
+def simple_returns(prices: np.ndarray) -> np.ndarray:
+    """ Period over period returns, one element shorter than prices.
+    :param prices:
+    :return:
+    """
+    return prices[1:] / prices[:-1] - 1.0
+
+
+def rolling_returns(prices: np.ndarray, window: int) -> np.ndarray:
+    """ Return over each trailing window, `len(prices) - window` elements.
+    :param prices:
+    :param window: number of periods
+    :return:
+    """
+    if window < 1:
+        raise WrongInputValueException(extra='`window` should be a positive integer.')
+    return prices[window:] / prices[:-window] - 1.0
+
+
+def rolling_volatility(prices: np.ndarray, window: int, annualize_by: Optional[int] = None) -> np.ndarray:
+    """ Standard deviation of the period returns over each trailing window.
+    :param prices:
+    :param window: number of returns in each window
+    :param annualize_by: periods per year, e.g. 252 for daily data, leave empty to keep the raw volatility.
+    :return:
+    """
+    if window < 2:
+        raise WrongInputValueException(extra='`window` should be an integer greater than 1.')
+    returns = simple_returns(prices)
+    if len(returns) < window:
+        return np.empty(0)
+    windows = np.lib.stride_tricks.sliding_window_view(returns, window)
+    volatility = windows.std(axis=1, ddof=1)
+    if annualize_by:
+        volatility = volatility * np.sqrt(annualize_by)
+    return volatility
+
+
+def exponential_moving_averages(prices: np.ndarray, time_periods: np.ndarray) -> np.ndarray:
+    """ Exponential moving averages of the same prices for many periods at once, each seeded with the first price
+    and smoothed by 2 / (time_period + 1). The recursion runs once over time, vectorized across the periods.
+    :param prices:
+    :param time_periods: moving average windows
+    :return: shape (len(time_periods), len(prices))
+    """
+    time_periods = np.asarray(time_periods)
+    if np.any(time_periods < 1):
+        raise WrongInputValueException(extra='`time_period` should be a positive integer.')
+    alpha = 2.0 / (time_periods.astype(np.float64) + 1.0)
+    result = np.empty((len(time_periods), len(prices)), dtype=np.float64)
+    if len(prices) == 0:
+        return result
+    result[:, 0] = prices[0]
+    for i in range(1, len(prices)):
+        result[:, i] = alpha * prices[i] + (1.0 - alpha) * result[:, i - 1]
+    return result
+
+
+def exponential_moving_average(prices: np.ndarray, time_period: int) -> np.ndarray:
+    """ Exponential moving average seeded with the first price, smoothed by 2 / (time_period + 1).
+    :param prices:
+    :param time_period: moving average window
+    :return:
+    """
+    return exponential_moving_averages(prices, np.array([time_period]))[0]
+
+
+def _symbol_metrics(task: Tuple[str, str, str, int, int]) -> Tuple[str, Optional[Dict[str, float]]]:
+    """ Worker: load one stored series and compute its screening metrics.
+    :param task: output_dest, symbol, interval, window, ema_period
+    :return: symbol, metrics (None if the symbol has no usable stored series)
+    """
+    output_dest, symbol, interval, window, ema_period = task
+    try:
+        series = load_stored_series(output_dest=output_dest, symbol=symbol, interval=interval)
+    except FileNotFoundError:
+        return symbol, None
+    if 'close' not in series.columns or len(series.timestamps) <= window:
+        return symbol, None
+    close = series.column('close')
+    ema = exponential_moving_average(close, ema_period)
+    return symbol, {
+        'last_close': float(close[-1]),
+        'return': float(rolling_returns(close, window)[-1]),
+        'volatility': float(rolling_volatility(close, window, periods_per_year(interval, series.timestamps))[-1]),
+        'ema': float(ema[-1]),
+        'close_to_ema': float(close[-1] / ema[-1] - 1.0),
+    }
+
+
+def _symbol_closes(task: Tuple[str, str, str]) -> Tuple[str, Optional[np.ndarray], Optional[np.ndarray]]:
+    """ Worker: load the close prices of one stored series.
+    :param task: output_dest, symbol, interval
+    :return: symbol, timestamps, closes
+    """
+    output_dest, symbol, interval = task
+    try:
+        series = load_stored_series(output_dest=output_dest, symbol=symbol, interval=interval)
+    except FileNotFoundError:
+        return symbol, None, None
+    if 'close' not in series.columns or len(series.timestamps) < 2:
+        return symbol, None, None
+    return symbol, series.timestamps, series.column('close')
+
+
+class SymbolScreener(object):
+    """ Analytics over the series already stored by the runner, spread across a process pool.
+    Each worker reads its own files, so only the file location and the small results cross process boundaries.
+    """
+
+    def __init__(self, output_dest: str, interval: str = 'daily', workers: Optional[int] = None):
+        """ Initialize the class
+        :param output_dest: the folder the runner saves its results into.
+        :param interval:
+        :param workers: number of processes, defaults to the number of cpus.
+        """
+        if not os.path.isdir(output_dest):
+            raise FileNotFoundError('The provided directory does not exist.')
+        self.output_dest = output_dest
+        self.interval = interval
+        self.workers = workers or os.cpu_count() or 1
+
+    def _map(self, func, tasks: list) -> list:
+        """ Run the tasks over the pool, in process when there is a single worker or a single task.
+        :param func:
+        :param tasks:
+        :return:
+        """
+        if self.workers == 1 or len(tasks) <= 1:
+            return [func(task) for task in tasks]
+        chunk_size = max(1, len(tasks) // (self.workers * 4))
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(func, tasks, chunksize=chunk_size))
+
+    def _symbols(self, symbols: Optional[List[str]]) -> List[str]:
+        return symbols if symbols is not None else list_stored_symbols(self.output_dest, self.interval)
+
+    def metrics(self, symbols: Optional[List[str]] = None, window: int = 20,
+                ema_period: int = 50) -> Dict[str, Dict[str, float]]:
+        """ Latest rolling return, volatility and ema distance of every symbol.
+        :param symbols: defaults to every stored symbol for the interval.
+        :param window: number of periods for returns and volatility.
+        :param ema_period:
+        :return: symbol -> metrics, symbols without enough stored data are left out.
+        """
+        tasks = [(self.output_dest, symbol, self.interval, window, ema_period) for symbol in self._symbols(symbols)]
+        return {symbol: metrics for symbol, metrics in self._map(_symbol_metrics, tasks) if metrics is not None}
+
+    def screen(self, thresholds: Dict[str, Tuple[Optional[float], Optional[float]]],
+               symbols: Optional[List[str]] = None, window: int = 20,
+               ema_period: int = 50) -> Dict[str, Dict[str, float]]:
+        """ Keep the symbols whose metrics fall within the given bounds,
+        e.g. {'volatility': (None, 0.3), 'close_to_ema': (0, None)}.
+        :param thresholds: metric -> (lower, upper), None leaves that side open.
+        :param symbols:
+        :param window:
+        :param ema_period:
+        :return:
+        """
+        result = {}
+        for symbol, metrics in self.metrics(symbols=symbols, window=window, ema_period=ema_period).items():
+            for name, (lower, upper) in thresholds.items():
+                if name not in metrics:
+                    raise WrongInputValueException(extra=f'`threshold` should be one of following: '
+                                                         f'{list(metrics.keys())}, {name} is not accepted.')
+                if (lower is not None and metrics[name] < lower) or (upper is not None and metrics[name] > upper):
+                    break
+            else:
+                result[symbol] = metrics
+        return result
+
+    def correlation_matrix(self, symbols: Optional[List[str]] = None) -> Tuple[List[str], np.ndarray]:
+        """ Correlation of the close to close returns, over the timestamps shared by all the symbols.
+        The closes are aligned first, so a bar missing for one symbol (e.g. a holiday of its exchange) does not
+        make its next return span two periods while the others span one.
+        :param symbols:
+        :raises WrongInputValueException: if the symbols share less than two timestamps.
+        :return: the symbols in matrix order, the correlation matrix.
+        """
+        tasks = [(self.output_dest, symbol, self.interval) for symbol in self._symbols(symbols)]
+        loaded = [(symbol, timestamps, closes) for symbol, timestamps, closes in self._map(_symbol_closes, tasks)
+                  if closes is not None]
+        if not loaded:
+            return [], np.empty((0, 0))
+        common = loaded[0][1]
+        for _, timestamps, _ in loaded[1:]:
+            common = np.intersect1d(common, timestamps, assume_unique=True)
+        if len(common) < 2:
+            raise WrongInputValueException(extra=f'The stored series of {[symbol for symbol, _, _ in loaded]} share '
+                                                 f'{len(common)} timestamps, at least two are needed to correlate '
+                                                 f'their returns.')
+        closes = np.vstack([closes[np.isin(timestamps, common)] for _, timestamps, closes in loaded])
+        matrix = closes[:, 1:] / closes[:, :-1] - 1.0
+        return [symbol for symbol, _, _ in loaded], np.atleast_2d(np.corrcoef(matrix))
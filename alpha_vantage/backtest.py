@@ -0,0 +1,182 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from alpha_vantage.analytics import exponential_moving_averages, load_stored_series, parse_series, periods_per_year
+from alpha_vantage.shared_series import SharedSeriesHandle, SharedSeriesRegistry, attach
+from helpers.custom_exceptions_helper import WrongInputValueException
+
+RESULT_COLUMNS = ('fast', 'slow', 'total_return', 'sharpe', 'max_drawdown', 'trades')
+
+
+def crossover_grid(fast_periods: Sequence[int], slow_periods: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """ Every (fast, slow) pair with fast < slow. A fast period of 1 is the price itself,
+    so (1, n) trades the price against its ema(n).
+    :param fast_periods:
+    :param slow_periods:
+    :return: fast, slow arrays of the same length
+    """
+    fast, slow = np.meshgrid(np.asarray(fast_periods, dtype=np.int64), np.asarray(slow_periods, dtype=np.int64))
+    keep = fast < slow
+    return fast[keep], slow[keep]
+
+
+def run_crossover(prices: np.ndarray, fast: np.ndarray, slow: np.ndarray, cost: float = 0.0,
+                  allow_short: bool = False, periods_per_year: int = 252) -> Dict[str, np.ndarray]:
+    """ Backtest ema crossover strategies, vectorized across the configurations: long while ema(fast) is above
+    ema(slow), flat (or short when allowed) otherwise. Positions are taken on the next bar, and every configuration
+    stays flat during its first `slow` bars, while its slow ema warms up.
+    :param prices: close prices, oldest first
+    :param fast: fast period of each configuration
+    :param slow: slow period of each configuration
+    :param cost: proportional cost of each position change, e.g. 0.001 for 10 basis points.
+    :param allow_short:
+    :param periods_per_year: to annualize the sharpe ratio.
+    :return: one array per RESULT_COLUMNS, one element per configuration
+    """
+    fast, slow = np.asarray(fast), np.asarray(slow)
+    if len(prices) < 2:
+        raise WrongInputValueException(extra='At least two prices are needed to backtest.')
+    # each distinct period is computed once, then shared by every configuration using it
+    periods, index = np.unique(np.concatenate([fast, slow]), return_inverse=True)
+    emas = exponential_moving_averages(prices, periods)
+    fast_ema, slow_ema = emas[index[:len(fast)]], emas[index[len(fast):]]
+
+    signal = np.where(fast_ema > slow_ema, 1.0, -1.0 if allow_short else 0.0)
+    signal[np.arange(len(prices))[None, :] < slow[:, None]] = 0.0
+    # the signal of bar t is traded at the close of bar t, so it earns the return of bar t + 1
+    positions = signal[:, :-1]
+    returns = prices[1:] / prices[:-1] - 1.0
+    turnover = np.abs(np.diff(positions, axis=1, prepend=0.0))
+    strategy_returns = positions * returns[None, :] - cost * turnover
+
+    equity = np.cumprod(1.0 + strategy_returns, axis=1)
+    drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1.0
+    deviation = strategy_returns.std(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(deviation > 0, strategy_returns.mean(axis=1) / deviation * np.sqrt(periods_per_year), 0.0)
+    return {
+        'fast': fast,
+        'slow': slow,
+        'total_return': equity[:, -1] - 1.0,
+        'sharpe': sharpe,
+        'max_drawdown': drawdown.min(axis=1),
+        'trades': np.count_nonzero(turnover, axis=1),
+    }
+
+
+def _run_chunk(task: Tuple[Union[np.ndarray, SharedSeriesHandle], np.ndarray, np.ndarray, float, bool,
+                           int]) -> Dict[str, np.ndarray]:
+    """ Worker: backtest one chunk of the configurations.
+    :param task: prices (or the handle of the shared prices), fast, slow, cost, allow_short, periods_per_year
+    :return:
+    """
+    prices, fast, slow, cost, allow_short, periods_per_year = task
+    if isinstance(prices, SharedSeriesHandle):
+        prices = attach(prices).values[:, 0]
+    return run_crossover(prices, fast, slow, cost=cost, allow_short=allow_short, periods_per_year=periods_per_year)
+
+
+class Backtester(object):
+    """ Backtests ema crossover strategies over an already fetched series, without calling the api.
+    Parameter sweeps are split in chunks run across a process pool, each chunk vectorized with numpy.
+    """
+
+    def __init__(self, prices: np.ndarray, timestamps: Optional[np.ndarray] = None, periods_per_year: int = 252,
+                 cost: float = 0.0, allow_short: bool = False, workers: Optional[int] = None):
+        """ Initialize the class
+        :param prices: close prices, oldest first
+        :param timestamps:
+        :param periods_per_year: 252 for daily bars, to annualize the sharpe ratio, see `periods_per_year`.
+        :param cost: proportional cost of each position change.
+        :param allow_short:
+        :param workers: number of processes, defaults to the number of cpus.
+        """
+        self.prices = np.ascontiguousarray(prices, dtype=np.float64)
+        self.timestamps = timestamps
+        self.periods_per_year = periods_per_year
+        self.cost = cost
+        self.allow_short = allow_short
+        self.workers = workers or os.cpu_count() or 1
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Dict[str, str]], column: str = 'close', interval: Optional[str] = None,
+                    **kwargs) -> 'Backtester':
+        """ Build from the json result of `get_daily_timeseries`, `get_intraday` ... etc.
+        :param result:
+        :param column:
+        :param interval: of the result, to annualize the sharpe ratio; without it, the bars are taken as daily.
+        :return:
+        """
+        timestamps, values, columns = parse_series(result)
+        if column not in columns:
+            raise WrongInputValueException(extra=f'`column` should be one of following: {columns}, '
+                                                 f'{column} is not accepted.')
+        if interval is not None:
+            kwargs.setdefault('periods_per_year', periods_per_year(interval, timestamps))
+        return cls(prices=values[:, columns.index(column)], timestamps=timestamps, **kwargs)
+
+    @classmethod
+    def from_stored(cls, output_dest: str, symbol: str, interval: str, column: str = 'close',
+                    **kwargs) -> 'Backtester':
+        """ Build from the most recent series the runner stored for the symbol.
+        :param output_dest:
+        :param symbol:
+        :param interval:
+        :param column:
+        :return:
+        """
+        series = load_stored_series(output_dest=output_dest, symbol=symbol, interval=interval)
+        kwargs.setdefault('periods_per_year', periods_per_year(interval, series.timestamps))
+        return cls(prices=series.column(column), timestamps=series.timestamps, **kwargs)
+
+    def run(self, fast: Sequence[int], slow: Sequence[int]) -> Dict[str, np.ndarray]:
+        """ Backtest the given configurations in process.
+        :param fast:
+        :param slow:
+        :return:
+        """
+        return run_crossover(self.prices, np.asarray(fast), np.asarray(slow), cost=self.cost,
+                             allow_short=self.allow_short, periods_per_year=self.periods_per_year)
+
+    def sweep(self, fast_periods: Sequence[int], slow_periods: Sequence[int],
+              chunk_size: int = 256) -> Dict[str, np.ndarray]:
+        """ Backtest every (fast, slow) pair of the grid, across the process pool.
+        The prices are published once in shared memory, the tasks only carry the configurations.
+        :param fast_periods:
+        :param slow_periods:
+        :param chunk_size: configurations per task, bounds the memory of each worker.
+        :return: one array per RESULT_COLUMNS, one element per configuration
+        """
+        fast, slow = crossover_grid(fast_periods, slow_periods)
+        chunks = [(fast[i:i + chunk_size], slow[i:i + chunk_size]) for i in range(0, len(fast), chunk_size)]
+        if not chunks:
+            return {name: np.empty(0) for name in RESULT_COLUMNS}
+        if self.workers == 1 or len(chunks) <= 1:
+            results = [_run_chunk((self.prices, fast, slow, self.cost, self.allow_short, self.periods_per_year))
+                       for fast, slow in chunks]
+        else:
+            with SharedSeriesRegistry() as registry:
+                handle = registry.publish(symbol='', interval='', timestamps=np.arange(len(self.prices)),
+                                          values=self.prices[:, None], columns=['close'])
+                tasks = [(handle, fast, slow, self.cost, self.allow_short, self.periods_per_year)
+                         for fast, slow in chunks]
+                with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                    results = list(executor.map(_run_chunk, tasks))
+        return {name: np.concatenate([result[name] for result in results]) for name in RESULT_COLUMNS}
+
+
+def best(results: Dict[str, np.ndarray], key: str = 'sharpe', top: int = 10) -> List[Dict[str, float]]:
+    """ The best configurations of a sweep.
+    :param results: as returned by `Backtester.sweep`
+    :param key: one of RESULT_COLUMNS, higher is better.
+    :param top:
+    :return:
+    """
+    if key not in RESULT_COLUMNS:
+        raise WrongInputValueException(extra=f'`key` should be one of following: {RESULT_COLUMNS}, '
+                                             f'{key} is not accepted.')
+    order = np.argsort(-results[key], kind='stable')[:top]
+    return [{name: results[name][i].item() for name in RESULT_COLUMNS} for i in order]
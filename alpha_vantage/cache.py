@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl
+
+from alpha_vantage.market_session import MarketSessionRefreshPolicy, RefreshPolicy
+from alpha_vantage.transport import RequestsTransport, Response, request_key
+from constants import DEFAULT_CACHE_MAX_ENTRIES, DEFAULT_CACHE_SWEEP_INTERVAL, AlphaVantageKeys
+
+
+def is_cacheable(content: bytes, status_code: int = 200) -> bool:
+    """ Only keep proper results, error messages and usage limit notes must be asked again.
+    :param content:
+    :param status_code:
+    :return:
+    """
+    # the api answers errors with a small json object, no need to look into the whole body
+    head = content[:512]
+    return status_code == 200 and f'"{AlphaVantageKeys.ERR_KEY}"'.encode() not in head \
+        and f'"{AlphaVantageKeys.NOTE_KEY}"'.encode() not in head
+
+
+class _InFlight(object):
+    """ A load in progress, followers wait on it instead of loading the same key again.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache(object):
+    """ Thread safe in memory cache with per entry expiry. Concurrent loads of the same key are coalesced:
+    only the first caller runs the loader, the others wait for its result.
+    The memory stays bounded in a long running process: expired entries are swept periodically, and the least
+    recently used entries are dropped beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries: Optional[int] = DEFAULT_CACHE_MAX_ENTRIES,
+                 sweep_interval: float = DEFAULT_CACHE_SWEEP_INTERVAL):
+        """ Initialize the class
+        :param max_entries: None keeps every fresh entry.
+        :param sweep_interval: seconds between two sweeps of the expired entries, done while storing.
+        """
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self._entries = OrderedDict()  # type: Dict[Hashable, Tuple[object, float]]
+        self._last_sweep = time.time()
+        self._in_flight = {}  # type: Dict[Hashable, _InFlight]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable):
+        """ Return the fresh cached value, None if missing or expired.
+        :param key:
+        :return:
+        """
+        with self._lock:
+            return self._get(key, time.time())
+
+    def _get(self, key: Hashable, now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _sweep(self, now: float) -> int:
+        expired = [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        self._last_sweep = now
+        return len(expired)
+
+    def sweep(self) -> int:
+        """ Remove the expired entries.
+        :return: number of entries removed
+        """
+        with self._lock:
+            return self._sweep(time.time())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def set(self, key: Hashable, value, expires_at: float) -> None:
+        """ Store a value until the given time.
+        :param key:
+        :param value:
+        :param expires_at: epoch seconds
+        :return:
+        """
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            now = time.time()
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(now)
+            if self.max_entries is not None:
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return None
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Tuple[object, Optional[float]]]):
+        """ Return the cached value, or load it once however many callers ask for it at the same time.
+        :param key:
+        :param loader: returns the value and the epoch seconds it expires at, None to not cache it.
+        :return:
+        """
+        with self._lock:
+            value = self._get(key, time.time())
+            if value is not None:
+                self.hits += 1
+                return value
+            in_flight = self._in_flight.get(key)
+            leader = in_flight is None
+            if leader:
+                self.misses += 1
+                in_flight = self._in_flight[key] = _InFlight()
+
+        if not leader:
+            in_flight.done.wait()
+            if in_flight.error is not None:
+                raise in_flight.error
+            return in_flight.value
+
+        try:
+            value, expires_at = loader()
+            in_flight.value = value
+            if expires_at is not None:
+                self.set(key, value, expires_at)
+            return value
+        except Exception as e:
+            in_flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            in_flight.done.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        return None
+
+
+class CachingTransport(object):
+    """ Client side cache, answers repeated requests from memory until the refresh policy expires them.
+    By default the policy follows the market sessions learned from the search responses.
+    """
+
+    def __init__(self, transport=None, cache: Optional[ResponseCache] = None,
+                 refresh_policy: Optional[RefreshPolicy] = None):
+        """ Initialize the class
+        :param transport: the transport doing the actual requests, defaults to the network.
+        :param cache:
+        :param refresh_policy: defaults to `MarketSessionRefreshPolicy`.
+        """
+        self.transport = transport or RequestsTransport()
+        self.cache = cache or ResponseCache()
+        self.refresh_policy = refresh_policy or MarketSessionRefreshPolicy()
+
+    def get(self, url: str, **kwargs):
+        params = dict(parse_qsl(urlsplit(url).query, keep_blank_values=True))
+
+        def _load():
+            response = self.transport.get(url, **kwargs)
+            result = Response(content=response.content, status_code=response.status_code)
+            if not is_cacheable(result.content, result.status_code):
+                return result, None
+            self.refresh_policy.observe(params, result.content)
+            return result, self.refresh_policy.expires_at(params)
+
+        return self.cache.get_or_load(request_key(url), _load)
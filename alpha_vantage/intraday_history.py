@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Dict, List, Optional
+
+from alpha_vantage.alpha_vantage import AlphaVantage
+from constants import DEFAULT_OUTPUT_FOLDER, AlphaVantageValues
+from helpers.custom_exceptions_helper import AlphaVantageApiException, WrongInputValueException
+from helpers.rate_limiter import RateLimiter
+
+
+def month_slices(start: str, end: str) -> List[str]:
+    """ Every month between two months, included.
+    :param start: `YYYY-MM`
+    :param end: `YYYY-MM`
+    :raises WrongInputValueException:
+    :return: `YYYY-MM` strings, oldest first
+    """
+    try:
+        first, last = date.fromisoformat(f'{start}-01'), date.fromisoformat(f'{end}-01')
+    except ValueError:
+        raise WrongInputValueException(extra=f'Months should be given as YYYY-MM, {start} - {end} is not accepted.')
+    if first > last:
+        raise WrongInputValueException(extra=f'`start` should not be after `end`, {start} - {end} is not accepted.')
+    months = []
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        months.append(f'{year:04d}-{month:02d}')
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+class IntradayHistoryFetcher(object):
+    """ Fetches years of intraday history one month per request, in parallel under the rate limiter.
+    Every finished month is kept as a checkpoint file, so an interrupted fetch resumes with the missing months only,
+    then the months are streamed in order from the checkpoints into one time ordered series in the output folder,
+    holding a single month in memory at a time.
+    """
+
+    def __init__(self, alpha_vantage: AlphaVantage, output_dest: str, rate_limiter: Optional[RateLimiter] = None,
+                 workers: int = 4):
+        """ Initialize the class
+        :param alpha_vantage:
+        :param output_dest: where the merged series (and the checkpoints) are written.
+        :param rate_limiter: defaults to the alpha vantage usage limits, share it with other jobs using the same key.
+        :param workers: number of requests in flight at the same time.
+        """
+        if not os.path.isdir(output_dest):
+            raise FileNotFoundError('The provided directory does not exist.')
+        self.alpha_vantage = alpha_vantage
+        self.output_dest = output_dest
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.workers = workers
+
+    def checkpoint_dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.output_dest, f'.{symbol}_{interval}_history')
+
+    def _fetch_month(self, symbol: str, interval: str, month: str,
+                     checkpoint_dir: str) -> Optional[Dict[str, Dict[str, str]]]:
+        """ Fetch one month, and keep it as a checkpoint unless it is the current (still growing) month.
+        :param symbol:
+        :param interval:
+        :param month:
+        :param checkpoint_dir:
+        :return: the current month, None once written as a checkpoint
+        """
+        self.rate_limiter.acquire()
+        result = self.alpha_vantage.get_intraday(symbol=symbol, interval=interval, month=month, output_size='full',
+                                                 force_json=True)
+        if month < date.today().strftime('%Y-%m'):
+            file_name = os.path.join(checkpoint_dir, f'{month}.json')
+            with open(f'{file_name}.tmp', 'w') as outfile:
+                json.dump(result, outfile, separators=(',', ':'))
+            # the rename makes the checkpoint appear complete or not at all
+            os.replace(f'{file_name}.tmp', file_name)
+            return None
+        return result
+
+    @staticmethod
+    def _write_month(outfile, month: str, bars: Dict[str, Dict[str, str]], first: bool) -> bool:
+        """ Append the bars of one month to the merged json object, in time order.
+        :param outfile:
+        :param month: bars of the neighbouring months, that the api may return, are left out.
+        :param bars:
+        :param first: whether nothing was written yet
+        :return: whether nothing was written yet
+        """
+        for timestamp in sorted(bars):
+            if timestamp[:7] != month:
+                continue
+            outfile.write(f'{"" if first else ","}{json.dumps(timestamp)}:'
+                          f'{json.dumps(bars[timestamp], separators=(",", ":"))}')
+            first = False
+        return first
+
+    def fetch(self, symbol: str, interval: str, start: str, end: str) -> str:
+        """ Fetch the intraday history between two months, and write it to the output folder as
+        `{symbol}_{interval}_{timestamp}.json`, like the runner does.
+        :param symbol:
+        :param interval: one of the intraday intervals, e.g. `1min`
+        :param start: first month, `YYYY-MM`
+        :param end: last month, `YYYY-MM`
+        :raises AlphaVantageApiException: if some months could not be fetched, the others are kept for the next run.
+        :return: the written file
+        """
+        if interval not in AlphaVantageValues.TIME_INTERVALS_MAP[:5]:
+            raise WrongInputValueException(extra=f'`interval` should be one of following: '
+                                                 f'{AlphaVantageValues.TIME_INTERVALS_MAP[:5]}, '
+                                                 f'{interval} is not accepted.')
+        months = month_slices(start, end)
+        checkpoint_dir = self.checkpoint_dir(symbol, interval)
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+        missing = [month for month in months if not os.path.isfile(os.path.join(checkpoint_dir, f'{month}.json'))]
+        # the current month has no checkpoint, it is kept from the response
+        unsaved = {}
+        failed = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {month: executor.submit(self._fetch_month, symbol, interval, month, checkpoint_dir)
+                       for month in missing}
+            for month, future in futures.items():
+                try:
+                    result = future.result()
+                except AlphaVantageApiException as e:
+                    failed[month] = e
+                    continue
+                if result is not None:
+                    unsaved[month] = result
+        if failed:
+            raise AlphaVantageApiException(extra={
+                'message': f'{len(failed)} of {len(months)} months could not be fetched, run again to resume.',
+                'months': sorted(failed.keys()),
+            })
+
+        # the months do not overlap once clipped, so they are written one after the other and dropped
+        file_name = os.path.join(self.output_dest, f'{symbol}_{interval}_{time.time()}.json')
+        with open(file_name, 'w') as outfile:
+            outfile.write('{')
+            first = True
+            for month in months:
+                bars = unsaved.pop(month, None)
+                if bars is None:
+                    with open(os.path.join(checkpoint_dir, f'{month}.json'), 'r') as reader_file:
+                        bars = json.load(reader_file)
+                first = self._write_month(outfile, month, bars, first)
+                del bars
+            outfile.write('}')
+        return file_name
+
+
+def get_arg_parser():
+    arg_parser = argparse.ArgumentParser(description='Alpha Vantage intraday history')
+    arg_parser.add_argument('-k',
+                            '--api-key',
+                            type=str,
+                            required=True,
+                            help="apikey for alpha vantage api.")
+    arg_parser.add_argument('-s',
+                            '--symbol',
+                            type=str,
+                            required=True)
+    arg_parser.add_argument('-i',
+                            '--interval',
+                            type=str,
+                            default='1min',
+                            choices=AlphaVantageValues.TIME_INTERVALS_MAP[:5])
+    arg_parser.add_argument('--start',
+                            type=str,
+                            required=True,
+                            help="First month, YYYY-MM.")
+    arg_parser.add_argument('--end',
+                            type=str,
+                            default=date.today().strftime('%Y-%m'),
+                            help="Last month, YYYY-MM. If not provided, the current month.")
+    arg_parser.add_argument('-d',
+                            '--output-folder',
+                            type=str,
+                            default=DEFAULT_OUTPUT_FOLDER,
+                            help="Where the merged series is written.")
+    arg_parser.add_argument('-b',
+                            '--base-url',
+                            type=str,
+                            required=False,
+                            help="Send the api requests to this url instead of alpha vantage, e.g. a local proxy.")
+    arg_parser.add_argument('-w',
+                            '--workers',
+                            type=int,
+                            default=4,
+                            help="Number of requests in flight at the same time.")
+    return arg_parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = get_arg_parser()
+    client = AlphaVantage(key=args.api_key, base_url=args.base_url, validate_key=False)
+    fetcher = IntradayHistoryFetcher(alpha_vantage=client, output_dest=args.output_folder, workers=args.workers)
+    print(fetcher.fetch(symbol=args.symbol, interval=args.interval, start=args.start, end=args.end))
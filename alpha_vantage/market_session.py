@@ -0,0 +1,240 @@
+import json
+import re
+import threading
+import time
+from datetime import datetime, date, time as dtime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from constants import AlphaVantageCacheTtl, AlphaVantageFunctions, AlphaVantageKeys, AlphaVantageValues
+from helpers.custom_exceptions_helper import WrongInputValueException
+
+# functions whose result can change during the session, the others only change once the session is closed
+INTRADAY_FUNCTIONS = {AlphaVantageFunctions.INTRADAY, AlphaVantageFunctions.CURRENT_QOUTE}
+SESSION_FUNCTIONS = {AlphaVantageFunctions.DAILY, AlphaVantageFunctions.WEEKLY, AlphaVantageFunctions.MONTHLY}
+INTRADAY_INTERVALS = set(AlphaVantageValues.TIME_INTERVALS_MAP[:5])
+
+
+def parse_utc_offset(value: str) -> timedelta:
+    """ Parse the timezone of the search api, e.g. `UTC-04`, `UTC+01` or `UTC+5.5`.
+    :param value:
+    :raises WrongInputValueException:
+    :return:
+    """
+    match = re.fullmatch(r'UTC(?:([+-])(\d{1,2})(?:[.:](\d+))?)?', value.strip())
+    if match is None:
+        raise WrongInputValueException(extra=f'`timezone` should look like UTC-04, {value} is not accepted.')
+    sign, hours, fraction = match.groups()
+    if sign is None:
+        return timedelta(0)
+    minutes = int(hours) * 60
+    if fraction:
+        # `5.5` is a decimal hour, `05:30` is hours and minutes
+        minutes += round(float(f'0.{fraction}') * 60) if '.' in value else int(fraction)
+    return timedelta(minutes=minutes if sign == '+' else -minutes)
+
+
+class MarketSession(object):
+    """ Trading hours of a market, as reported by the search api, plus its holidays.
+    The timezone is a fixed utc offset, as the api reports it on the day of the search, so the session is only
+    valid around `registered_at`.
+    """
+
+    def __init__(self, market_open: dtime, market_close: dtime, utc_offset: timedelta,
+                 holidays: Iterable[date] = (), weekend: Tuple[int, ...] = (5, 6),
+                 registered_at: Optional[float] = None):
+        """ Initialize the class
+        :param market_open: local time
+        :param market_close: local time
+        :param utc_offset:
+        :param holidays: local dates the market is closed on.
+        :param weekend: week days the market is closed on, monday is 0.
+        :param registered_at: epoch seconds the utc offset was reported at, defaults to now.
+        """
+        self.market_open = market_open
+        self.market_close = market_close
+        self.tz = timezone(utc_offset)
+        self.holidays = frozenset(holidays)
+        self.weekend = weekend
+        self.registered_at = time.time() if registered_at is None else registered_at
+
+    @classmethod
+    def from_search_result(cls, entry: Dict[str, str], holidays: Iterable[date] = (),
+                           registered_at: Optional[float] = None) -> 'MarketSession':
+        """ Build the session from one result of `AlphaVantage.search`.
+        :param entry:
+        :param holidays:
+        :param registered_at: epoch seconds of the search, defaults to now.
+        :return:
+        """
+        return cls(market_open=dtime.fromisoformat(entry['5. marketOpen']),
+                   market_close=dtime.fromisoformat(entry['6. marketClose']),
+                   utc_offset=parse_utc_offset(entry['7. timezone']),
+                   holidays=holidays, registered_at=registered_at)
+
+    def is_trading_day(self, day: date) -> bool:
+        return day.weekday() not in self.weekend and day not in self.holidays
+
+    def _sessions(self, now: float) -> Iterator[Tuple[float, float]]:
+        """ (open, close) epoch seconds of the sessions, starting with the one of the current local day.
+        :param now:
+        :return:
+        """
+        day = datetime.fromtimestamp(now, self.tz).date()
+        # a year without a trading day means a broken calendar, stop there
+        for _ in range(366):
+            if self.is_trading_day(day):
+                opens_at = datetime.combine(day, self.market_open, self.tz).timestamp()
+                closes_at = datetime.combine(day, self.market_close, self.tz).timestamp()
+                yield opens_at, closes_at
+            day += timedelta(days=1)
+
+    def is_open(self, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        # the first session is the current day's when it is a trading day, a later one otherwise
+        for opens_at, closes_at in self._sessions(now):
+            return opens_at <= now < closes_at
+        return False
+
+    def next_open(self, now: Optional[float] = None) -> float:
+        """ Start of the next session, `now` if the market is open.
+        :param now: epoch seconds
+        :return: epoch seconds
+        """
+        now = time.time() if now is None else now
+        for opens_at, closes_at in self._sessions(now):
+            if now < closes_at:
+                return max(opens_at, now)
+        return float('inf')
+
+    def next_close(self, now: Optional[float] = None) -> float:
+        """ End of the current session, or of the next one when the market is closed.
+        :param now: epoch seconds
+        :return: epoch seconds
+        """
+        now = time.time() if now is None else now
+        for _, closes_at in self._sessions(now):
+            if now < closes_at:
+                return closes_at
+        return float('inf')
+
+
+class MarketCalendar(object):
+    """ Sessions of the symbols met in search results, with the holidays of their region.
+    The holiday file is a json object of region (as in `4. region`) to a list of `YYYY-MM-DD` dates.
+    A session is dropped once older than `session_lifetime`, so a daylight saving time change is picked up by the
+    next search instead of shifting the session by an hour.
+    """
+
+    def __init__(self, holidays_file: Optional[str] = None,
+                 session_lifetime: float = AlphaVantageCacheTtl.MARKET_SESSION):
+        """ Initialize the class
+        :param holidays_file:
+        :param session_lifetime: seconds a registered session is used for.
+        """
+        self.session_lifetime = session_lifetime
+        self.holidays = {}  # type: Dict[str, Set[date]]
+        self._sessions = {}  # type: Dict[str, MarketSession]
+        self._lock = threading.Lock()
+        if holidays_file:
+            self.load_holidays(holidays_file)
+
+    def load_holidays(self, holidays_file: str) -> None:
+        with open(holidays_file, 'r') as reader_file:
+            for region, days in json.load(reader_file).items():
+                self.holidays.setdefault(region, set()).update(date.fromisoformat(day) for day in days)
+        return None
+
+    def register(self, search_results: List[Dict[str, str]], now: Optional[float] = None) -> None:
+        """ Keep the session of each symbol of the search results.
+        :param search_results: as returned by `AlphaVantage.search`
+        :param now: epoch seconds of the search
+        :return:
+        """
+        now = time.time() if now is None else now
+        for entry in search_results:
+            try:
+                session = MarketSession.from_search_result(
+                    entry, holidays=self.holidays.get(entry.get('4. region'), ()), registered_at=now)
+            except (KeyError, ValueError, WrongInputValueException):
+                continue
+            with self._lock:
+                self._sessions[entry['1. symbol']] = session
+        return None
+
+    def session_for(self, symbol: str, now: Optional[float] = None) -> Optional[MarketSession]:
+        """ The session of a symbol, None if it was never registered or is stale.
+        :param symbol:
+        :param now: epoch seconds
+        :return:
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            session = self._sessions.get(symbol)
+            if session is not None and now - session.registered_at > self.session_lifetime:
+                del self._sessions[symbol]
+                return None
+            return session
+
+
+class RefreshPolicy(object):
+    """ Decides until when a response stays fresh, with a fixed ttl per function.
+    """
+
+    def expires_at(self, params: Dict[str, str], now: Optional[float] = None) -> float:
+        """ When a response to these parameters should be asked again.
+        :param params: the query parameters
+        :param now: epoch seconds
+        :return: epoch seconds
+        """
+        now = time.time() if now is None else now
+        return now + AlphaVantageCacheTtl.FUNCTIONS.get(params.get('function'), AlphaVantageCacheTtl.DEFAULT)
+
+    def observe(self, params: Dict[str, str], content: bytes) -> None:
+        """ Called with every successful response, before its expiry is computed.
+        :param params:
+        :param content:
+        :return:
+        """
+        return None
+
+
+class MarketSessionRefreshPolicy(RefreshPolicy):
+    """ Uses the trading hours of the symbol: nothing is asked again while its market is closed,
+    and daily (weekly, monthly) results expire exactly at the session close.
+    Symbols never seen in a search result, or not for a day, fall back to the fixed ttl.
+    """
+
+    def __init__(self, calendar: Optional[MarketCalendar] = None):
+        """ Initialize the class
+        :param calendar: learns the sessions from the search responses going through the policy.
+        """
+        self.calendar = calendar or MarketCalendar()
+
+    def observe(self, params: Dict[str, str], content: bytes) -> None:
+        if params.get('function') != AlphaVantageFunctions.SEARCH or params.get('datatype', 'json') != 'json':
+            return None
+        try:
+            self.calendar.register(json.loads(content).get(AlphaVantageKeys.SEARCH_KEY, []))
+        except (ValueError, AttributeError):
+            pass
+        return None
+
+    def expires_at(self, params: Dict[str, str], now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        expires_at = super(MarketSessionRefreshPolicy, self).expires_at(params, now)
+        session = self.calendar.session_for(params.get('symbol', ''), now)
+        if session is None:
+            return expires_at
+
+        function = params.get('function')
+        if function == AlphaVantageFunctions.EMA:
+            function = AlphaVantageFunctions.INTRADAY if params.get('interval') in INTRADAY_INTERVALS \
+                else AlphaVantageFunctions.DAILY
+        if function in INTRADAY_FUNCTIONS:
+            if not session.is_open(now):
+                return session.next_open(now)
+            # the first request after the close gets the final values
+            return min(expires_at, session.next_close(now))
+        if function in SESSION_FUNCTIONS:
+            return session.next_close(now)
+        return expires_at
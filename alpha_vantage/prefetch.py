@@ -0,0 +1,111 @@
+import threading
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple
+
+from helpers.rate_limiter import RateLimiter
+
+
+class Prefetcher(object):
+    """ Runs the requests the user is likely to ask for next, from a background thread, so that with a caching
+    transport they are answered instantly later. It only uses idle quota: it waits while a user request is in
+    progress, and keeps `reserve` calls of the rate limiter free for the user. The slot of each prefetch is taken
+    before it starts, so a user request never waits behind one.
+    """
+
+    def __init__(self, rate_limiter: RateLimiter, reserve: int = 1, poll_interval: float = 0.2):
+        """ Initialize the class
+        :param rate_limiter: the limiter the user requests go through as well.
+        :param reserve: calls left free for the user.
+        :param poll_interval: seconds between two checks of the quota while waiting for it.
+        """
+        self.rate_limiter = rate_limiter
+        self.reserve = reserve
+        self.poll_interval = poll_interval
+        self._tasks = []  # type: List[Callable[[], object]]
+        # bumped by `schedule`, a task put back after a replacement is dropped instead
+        self._generation = 0
+        self._user_requests = 0
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._thread = None  # type: Optional[threading.Thread]
+
+    def start(self) -> 'Prefetcher':
+        self._thread = threading.Thread(target=self._run, name='prefetcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """ Stop after the prefetch in progress, if any.
+        :param timeout: seconds to wait for it, the thread is a daemon and does not keep the process alive.
+        :return:
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return None
+
+    def schedule(self, tasks: List[Callable[[], object]]) -> None:
+        """ Replace the pending tasks, e.g. when the user selects another company.
+        :param tasks: callables doing one request each through the rate limiter, run in order; their errors
+            are ignored.
+        :return:
+        """
+        with self._condition:
+            self._tasks = list(tasks)
+            self._generation += 1
+            self._condition.notify_all()
+        return None
+
+    @property
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._tasks)
+
+    @contextmanager
+    def user_request(self):
+        """ Wrap the requests the user is waiting for, no new prefetch starts until they are done.
+        :return:
+        """
+        with self._condition:
+            self._user_requests += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._user_requests -= 1
+                self._condition.notify_all()
+
+    def _next_task(self) -> Tuple[Optional[Callable[[], object]], int]:
+        """ Wait for a task, no user request in progress and, likely, spare quota.
+        :return: the task, None once stopped, and the generation of the tasks it belongs to
+        """
+        with self._condition:
+            while not self._stopped:
+                if self._tasks and self._user_requests == 0:
+                    if self.rate_limiter.available() > self.reserve:
+                        return self._tasks.pop(0), self._generation
+                    # the quota frees up with time, nothing notifies it
+                    self._condition.wait(self.poll_interval)
+                else:
+                    self._condition.wait()
+        return None, self._generation
+
+    def _run(self) -> None:
+        while True:
+            task, generation = self._next_task()
+            if task is None:
+                return None
+            # the quota may have been taken since it was checked, the slot is only taken if still spare
+            with self.rate_limiter.prepaid(reserve=self.reserve) as acquired:
+                if not acquired:
+                    with self._condition:
+                        if generation == self._generation:
+                            self._tasks.insert(0, task)
+                    continue
+                try:
+                    task()
+                except Exception:
+                    # a failed prefetch only means the user request will ask the api itself
+                    pass
@@ -0,0 +1,197 @@
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+from alpha_vantage.cache import ResponseCache, is_cacheable
+from alpha_vantage.market_session import MarketCalendar, MarketSessionRefreshPolicy, RefreshPolicy
+from alpha_vantage.transport import RequestsTransport, request_key
+from constants import ALPHA_VANTAGE_BASE_URL, DEFAULT_CACHE_MAX_ENTRIES, DEFAULT_PROXY_HOST, DEFAULT_PROXY_PORT, \
+    DEFAULT_PROXY_QUEUE_TIMEOUT, AlphaVantageKeys
+from helpers.rate_limiter import RateLimiter
+
+
+class _ProxyRequestHandler(BaseHTTPRequestHandler):
+    """ Answers `/query?function=...` like the alpha vantage api, and `/stats` with the proxy counters.
+    """
+
+    def do_GET(self):
+        proxy = self.server.proxy
+        path = urlsplit(self.path).path
+        if path == '/query':
+            status_code, content = proxy.fetch(self.path)
+        elif path == '/stats':
+            status_code, content = 200, json.dumps(proxy.stats()).encode('utf-8')
+        else:
+            status_code, content = 404, json.dumps({AlphaVantageKeys.ERR_KEY: f'Unknown path {path}'}).encode('utf-8')
+
+        self.send_response(status_code)
+        content_type = 'application/json' if content.lstrip()[:1] in (b'{', b'[') else 'text/csv'
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        if self.server.proxy.verbose:
+            super(_ProxyRequestHandler, self).log_message(format, *args)
+
+
+class AlphaVantageProxy(object):
+    """ Local daemon shared by every client process on the machine. It speaks the same `/query` interface as the
+    alpha vantage api, and adds a single rate limiter, a response cache and coalescing of identical requests.
+    Point a client at it with `AlphaVantage(key, base_url=proxy.base_url)`.
+    """
+
+    def __init__(self, host: str = DEFAULT_PROXY_HOST, port: int = DEFAULT_PROXY_PORT,
+                 upstream_url: str = ALPHA_VANTAGE_BASE_URL, api_key: Optional[str] = None, transport=None,
+                 cache: Optional[ResponseCache] = None, rate_limiter: Optional[RateLimiter] = None,
+                 queue_timeout: Optional[float] = DEFAULT_PROXY_QUEUE_TIMEOUT,
+                 refresh_policy: Optional[RefreshPolicy] = None, verbose: bool = False):
+        """ Initialize the class
+        :param host:
+        :param port: 0 picks a free port.
+        :param upstream_url: where the requests are forwarded, the alpha vantage api or a mock of it.
+        :param api_key: if provided, replaces the api key sent by the clients.
+        :param transport: sends the upstream requests, defaults to the network.
+        :param cache:
+        :param rate_limiter: defaults to the alpha vantage usage limits.
+        :param queue_timeout: seconds a request may wait for the rate limiter, when the limit frees up later the
+            usage note is answered right away. None waits as long as needed, up to a day once the daily quota is used.
+        :param refresh_policy: how long responses are cached, defaults to `MarketSessionRefreshPolicy`.
+        :param verbose: log every request.
+        """
+        self.upstream_url = upstream_url.rstrip('/')
+        self.api_key = api_key
+        self.transport = transport or RequestsTransport()
+        self.cache = cache or ResponseCache()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.queue_timeout = queue_timeout
+        self.refresh_policy = refresh_policy or MarketSessionRefreshPolicy()
+        self.verbose = verbose
+        self.upstream_requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _ProxyRequestHandler)
+        self._server.daemon_threads = True
+        self._server.proxy = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def fetch(self, path: str) -> Tuple[int, bytes]:
+        """ Answer a `/query` request, from the cache when possible.
+        :param path: the request path and query string
+        :return: status code, body
+        """
+        parts = urlsplit(path)
+        params = parse_qsl(parts.query, keep_blank_values=True)
+        if self.api_key:
+            params = [(name, value) for name, value in params if name != 'apikey'] + [('apikey', self.api_key)]
+        url = f'{self.upstream_url}{parts.path}?{urlencode(params)}'
+
+        def _load():
+            if not self.rate_limiter.acquire(timeout=self.queue_timeout):
+                note = {AlphaVantageKeys.NOTE_KEY: 'Proxy rate limit reached, the request was not sent.'}
+                return (200, json.dumps(note).encode('utf-8')), None
+            with self._lock:
+                self.upstream_requests += 1
+            try:
+                response = self.transport.get(url, allow_redirects=True)
+            except Exception as e:
+                error = {AlphaVantageKeys.ERR_KEY: f'Upstream request failed: {e.__class__.__name__}'}
+                return (502, json.dumps(error).encode('utf-8')), None
+            result = (response.status_code, response.content)
+            if not is_cacheable(response.content, response.status_code):
+                return result, None
+            self.refresh_policy.observe(dict(params), response.content)
+            return result, self.refresh_policy.expires_at(dict(params))
+
+        return self.cache.get_or_load(request_key(url), _load)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+            'upstream_requests': self.upstream_requests,
+            'available_calls': self.rate_limiter.available(),
+        }
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+        return None
+
+    def start(self) -> 'AlphaVantageProxy':
+        """ Serve from a background thread.
+        :return:
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        return None
+
+
+def get_arg_parser():
+    arg_parser = argparse.ArgumentParser(description='Alpha Vantage local caching proxy')
+    arg_parser.add_argument('--host',
+                            type=str,
+                            default=DEFAULT_PROXY_HOST,
+                            help="Address to listen on.")
+    arg_parser.add_argument('-p',
+                            '--port',
+                            type=int,
+                            default=DEFAULT_PROXY_PORT,
+                            help="Port to listen on.")
+    arg_parser.add_argument('-u',
+                            '--upstream-url',
+                            type=str,
+                            default=ALPHA_VANTAGE_BASE_URL,
+                            help="Where the requests are forwarded.")
+    arg_parser.add_argument('-k',
+                            '--api-key',
+                            type=str,
+                            required=False,
+                            help="If provided, replaces the apikey sent by the clients.")
+    arg_parser.add_argument('-q',
+                            '--queue-timeout',
+                            type=float,
+                            default=DEFAULT_PROXY_QUEUE_TIMEOUT,
+                            help="Seconds a request may wait for the usage limits, when they free up later the usage "
+                                 "note is answered right away.")
+    arg_parser.add_argument('--cache-entries',
+                            type=int,
+                            default=DEFAULT_CACHE_MAX_ENTRIES,
+                            help="Responses kept in memory, the least recently used are dropped beyond it.")
+    arg_parser.add_argument('--holidays',
+                            type=str,
+                            required=False,
+                            help="Json file of market holidays, region (as in the search results) to a list of "
+                                 "YYYY-MM-DD dates. Nothing is asked again while a market is closed.")
+    arg_parser.add_argument('-v',
+                            '--verbose',
+                            action='store_true',
+                            help="Log every request.")
+    return arg_parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = get_arg_parser()
+    refresh_policy = MarketSessionRefreshPolicy(calendar=MarketCalendar(holidays_file=args.holidays))
+    proxy = AlphaVantageProxy(host=args.host, port=args.port, upstream_url=args.upstream_url, api_key=args.api_key,
+                              cache=ResponseCache(max_entries=args.cache_entries), queue_timeout=args.queue_timeout,
+                              refresh_policy=refresh_policy, verbose=args.verbose)
+    print(f'Serving on {proxy.base_url}')
+    try:
+        proxy.serve_forever()
+    except KeyboardInterrupt:
+        proxy.shutdown()
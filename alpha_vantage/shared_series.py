@@ -0,0 +1,200 @@
+import sys
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from alpha_vantage.analytics import StoredSeries, load_stored_series, parse_series
+from helpers.custom_exceptions_helper import WrongInputValueException
+
+# blocks attached by this process, kept open until `detach`, or until the series is unpublished in this process
+_ATTACHED = {}  # type: Dict[str, shared_memory.SharedMemory]
+# blocks published by the registries of this process, attaching to them reuses the publisher's mapping
+_PUBLISHED = {}  # type: Dict[str, shared_memory.SharedMemory]
+# handles given to the pool workers by `init_worker`
+_WORKER_HANDLES = {}  # type: Dict[Tuple[str, str], SharedSeriesHandle]
+
+
+class SharedSeriesHandle(object):
+    """ Small picklable description of a published series, all a worker needs to attach to it.
+    The block holds the timestamps (int64 seconds) followed by the values (float64, row major).
+    """
+
+    def __init__(self, symbol: str, interval: str, name: str, length: int, columns: List[str]):
+        """ Initialize the class
+        :param symbol:
+        :param interval:
+        :param name: the shared memory block name
+        :param length: number of timestamps
+        :param columns:
+        """
+        self.symbol = symbol
+        self.interval = interval
+        self.name = name
+        self.length = length
+        self.columns = columns
+
+    @property
+    def size(self) -> int:
+        return self.length * 8 * (1 + len(self.columns))
+
+    def views(self, buffer) -> Tuple[np.ndarray, np.ndarray]:
+        """ Read only arrays over the block, nothing is copied.
+        :param buffer:
+        :return: timestamps, values
+        """
+        timestamps = np.ndarray((self.length,), dtype=np.int64, buffer=buffer).view('datetime64[s]')
+        values = np.ndarray((self.length, len(self.columns)), dtype=np.float64, buffer=buffer,
+                            offset=self.length * 8)
+        timestamps.flags.writeable = False
+        values.flags.writeable = False
+        return timestamps, values
+
+
+def _open_block(name: str) -> shared_memory.SharedMemory:
+    """ Attach to an existing block. Only the publisher unlinks the block, so on python 3.13+ the attaching
+    process does not register it with the resource tracker.
+    :param name:
+    :return:
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def attach(handle: 'SharedSeriesHandle') -> StoredSeries:
+    """ Attach to a published series as read only arrays, without copying or deserializing.
+    :param handle:
+    :return:
+    """
+    block = _PUBLISHED.get(handle.name) or _ATTACHED.get(handle.name)
+    if block is None:
+        block = _ATTACHED[handle.name] = _open_block(handle.name)
+    timestamps, values = handle.views(block.buf)
+    return StoredSeries(symbol=handle.symbol, interval=handle.interval, timestamps=timestamps, values=values,
+                        columns=list(handle.columns))
+
+
+def detach(handle: 'SharedSeriesHandle') -> None:
+    """ Unmap a series attached by this process, the arrays returned by `attach` must not be used anymore.
+    :param handle:
+    :raises BufferError: if arrays over the block are still referenced.
+    :return:
+    """
+    block = _ATTACHED.get(handle.name)
+    if block is not None:
+        block.close()
+        del _ATTACHED[handle.name]
+    return None
+
+
+def init_worker(handles: Dict[Tuple[str, str], 'SharedSeriesHandle']) -> None:
+    """ Process pool initializer, e.g. `ProcessPoolExecutor(initializer=init_worker, initargs=(registry.handles,))`,
+    so the workers can attach by symbol and interval.
+    :param handles:
+    :return:
+    """
+    _WORKER_HANDLES.clear()
+    _WORKER_HANDLES.update(handles)
+    return None
+
+
+def attach_series(symbol: str, interval: str) -> StoredSeries:
+    """ Attach, from a pool worker, to a series published before the pool started.
+    :param symbol:
+    :param interval:
+    :raises WrongInputValueException:
+    :return:
+    """
+    handle = _WORKER_HANDLES.get((symbol, interval))
+    if handle is None:
+        raise WrongInputValueException(extra=f'No shared `{interval}` series for {symbol}.')
+    return attach(handle)
+
+
+class SharedSeriesRegistry(object):
+    """ Publishes parsed series once in shared memory, so worker processes read them in place instead of receiving
+    a pickled copy each. The registry owns the blocks: they are released by `close`.
+    """
+
+    def __init__(self):
+        self._blocks = {}  # type: Dict[Tuple[str, str], Tuple[shared_memory.SharedMemory, SharedSeriesHandle]]
+
+    @property
+    def handles(self) -> Dict[Tuple[str, str], SharedSeriesHandle]:
+        return {key: handle for key, (_, handle) in self._blocks.items()}
+
+    def handle(self, symbol: str, interval: str) -> Optional[SharedSeriesHandle]:
+        entry = self._blocks.get((symbol, interval))
+        return entry[1] if entry else None
+
+    def publish(self, symbol: str, interval: str, timestamps: np.ndarray, values: np.ndarray,
+                columns: List[str]) -> SharedSeriesHandle:
+        """ Copy a series into a new shared block, replacing the one already published for the symbol and interval.
+        :param symbol:
+        :param interval:
+        :param timestamps: datetime64 array
+        :param values: shape (len(timestamps), len(columns))
+        :param columns:
+        :return:
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(len(timestamps), len(columns))
+        self.unpublish(symbol, interval)
+        handle = SharedSeriesHandle(symbol=symbol, interval=interval, name='', length=len(timestamps),
+                                    columns=list(columns))
+        # a zero sized block is not allowed
+        block = shared_memory.SharedMemory(create=True, size=max(handle.size, 1))
+        handle.name = block.name
+        shared_timestamps, shared_values = handle.views(block.buf)
+        for target, source in ((shared_timestamps, timestamps.astype('datetime64[s]')), (shared_values, values)):
+            target.flags.writeable = True
+            target[...] = source
+            target.flags.writeable = False
+        del shared_timestamps, shared_values
+        self._blocks[(symbol, interval)] = (block, handle)
+        _PUBLISHED[block.name] = block
+        return handle
+
+    def publish_result(self, symbol: str, interval: str, result: Dict[str, Dict[str, str]]) -> SharedSeriesHandle:
+        """ Publish a json result of the timeseries apis, e.g. of `get_intraday`.
+        :param symbol:
+        :param interval:
+        :param result:
+        :return:
+        """
+        timestamps, values, columns = parse_series(result)
+        return self.publish(symbol, interval, timestamps, values, columns)
+
+    def publish_stored(self, output_dest: str, symbol: str, interval: str) -> SharedSeriesHandle:
+        """ Publish the most recent series the runner stored for the symbol.
+        :param output_dest:
+        :param symbol:
+        :param interval:
+        :return:
+        """
+        series = load_stored_series(output_dest=output_dest, symbol=symbol, interval=interval)
+        return self.publish(symbol, interval, series.timestamps, series.values, series.columns)
+
+    def unpublish(self, symbol: str, interval: str) -> None:
+        entry = self._blocks.pop((symbol, interval), None)
+        if entry is not None:
+            block, handle = entry
+            _PUBLISHED.pop(block.name, None)
+            detach(handle)
+            block.close()
+            block.unlink()
+        return None
+
+    def close(self) -> None:
+        """ Release every block, the workers must be done with them.
+        :return:
+        """
+        for symbol, interval in list(self._blocks.keys()):
+            self.unpublish(symbol, interval)
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
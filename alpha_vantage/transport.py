@@ -0,0 +1,181 @@
+import gzip
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+from helpers.custom_exceptions_helper import AlphaVantageApiException
+
+REDACTED = 'REDACTED'
+
+
+def request_key(url: str) -> Tuple[str, str]:
+    """ Identify a request by its path and sorted query parameters, without the api key,
+    so recordings can be shared and replayed with any key.
+    :param url:
+    :return: path, normalized query string
+    """
+    parts = urlsplit(url)
+    params = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                    if name != 'apikey')
+    return parts.path, urlencode(params)
+
+
+def redact_url(url: str) -> str:
+    """ Replace the api key in the url, so it can be logged or stored.
+    :param url:
+    :return:
+    """
+    parts = urlsplit(url)
+    params = [(name, REDACTED if name == 'apikey' else value)
+              for name, value in parse_qsl(parts.query, keep_blank_values=True)]
+    return parts._replace(query=urlencode(params)).geturl()
+
+
+class Response(object):
+    """ The parts of `requests.Response` used by the client.
+    """
+
+    def __init__(self, content: bytes, status_code: int = 200, elapsed: float = 0.0):
+        """ Initialize the class
+        :param content: the raw response body
+        :param status_code:
+        :param elapsed: seconds the request took
+        """
+        self.content = content
+        self.status_code = status_code
+        self.elapsed = elapsed
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class RequestsTransport(object):
+    """ Default transport, sends the requests to the network.
+    """
+
+    def get(self, url: str, **kwargs):
+        # imported on the first request, it is most of the cli startup time
+        import requests
+        return requests.get(url, **kwargs)
+
+
+class RateLimitedTransport(object):
+    """ Waits for the rate limiter before every request, so the usage limits are never exceeded.
+    Put it under a `CachingTransport`, so cached answers do not use the quota. A request made within
+    `rate_limiter.prepaid()` uses the slot taken ahead instead of waiting.
+    """
+
+    def __init__(self, rate_limiter, transport=None):
+        """ Initialize the class
+        :param rate_limiter: a `RateLimiter`, shared by everything using the same api key.
+        :param transport: the transport doing the actual requests, defaults to the network.
+        """
+        self.rate_limiter = rate_limiter
+        self.transport = transport or RequestsTransport()
+
+    def get(self, url: str, **kwargs):
+        self.rate_limiter.acquire()
+        return self.transport.get(url, **kwargs)
+
+
+class RecordingTransport(object):
+    """ Forward every request to another transport and record it: the redacted url, the response body and timing.
+    The archive is written when the transport is closed, as gzipped json lines.
+    """
+
+    def __init__(self, archive_path: str, transport=None):
+        """ Initialize the class
+        :param archive_path: where to write the recording, e.g. `session.jsonl.gz`
+        :param transport: the transport doing the actual requests, defaults to the network.
+        """
+        self.archive_path = archive_path
+        self.transport = transport or RequestsTransport()
+        self._entries = []
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+
+    def get(self, url: str, **kwargs):
+        started_at = time.monotonic()
+        response = self.transport.get(url, **kwargs)
+        duration = time.monotonic() - started_at
+        content = response.content
+        try:
+            body, encoding = content.decode('utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            body, encoding = content.decode('latin-1'), 'latin-1'
+        with self._lock:
+            self._entries.append({
+                'url': redact_url(url),
+                'status': response.status_code,
+                'offset': round(started_at - self._started_at, 6),
+                'duration': round(duration, 6),
+                'encoding': encoding,
+                'body': body,
+            })
+        return response
+
+    def close(self) -> None:
+        """ Write the recorded entries to the archive.
+        :return:
+        """
+        with self._lock:
+            entries = list(self._entries)
+        with gzip.open(self.archive_path, 'wt', encoding='utf-8') as outfile:
+            for entry in entries:
+                outfile.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ReplayTransport(object):
+    """ Serve the responses of an archive written by `RecordingTransport`, without any network.
+    Requests are matched on their parameters (the api key is ignored); when the same request was recorded several
+    times, the recordings are served in order and the last one is repeated.
+    """
+
+    def __init__(self, archive_path: str, speed: Optional[float] = None):
+        """ Initialize the class
+        :param archive_path:
+        :param speed: None serves the responses immediately, 1.0 replays the recorded pace: each request is answered
+            after its recorded latency, and not before its recorded offset from the first request,
+            2.0 replays it twice as fast ... etc.
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError('`speed` should be a positive number.')
+        self.archive_path = archive_path
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._served = {}
+        # when the replay would have started at the recorded pace, set by the first request
+        self._started_at = None  # type: Optional[float]
+        self._recordings = {}  # type: Dict[Tuple[str, str], List[dict]]
+        with gzip.open(archive_path, 'rt', encoding='utf-8') as reader_file:
+            for line in reader_file:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._recordings.setdefault(request_key(entry['url']), []).append(entry)
+
+    def get(self, url: str, **kwargs):
+        key = request_key(url)
+        if key not in self._recordings:
+            raise AlphaVantageApiException(extra=f'No recorded response for {redact_url(url)}')
+        with self._lock:
+            recordings = self._recordings[key]
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+            entry = recordings[min(index, len(recordings) - 1)]
+            if self.speed is not None and self._started_at is None:
+                self._started_at = time.monotonic() - entry['offset'] / self.speed
+        if self.speed is not None:
+            # keep the recorded gaps between the requests, unless the replaying code is slower
+            gap = self._started_at + entry['offset'] / self.speed - time.monotonic()
+            time.sleep(max(gap, 0.0) + entry['duration'] / self.speed)
+        return Response(content=entry['body'].encode(entry['encoding']), status_code=entry['status'],
+                        elapsed=entry['duration'])
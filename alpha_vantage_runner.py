@@ -2,25 +2,48 @@ import json
 import os
 import re
 import time
+from contextlib import nullcontext
 from typing import Dict, List, Union
 
 from alpha_vantage.alpha_vantage import AlphaVantage
+from alpha_vantage.prefetch import Prefetcher
 from constants import AlphaVantageValues, AlphaVantageFunctions
 from helpers.custom_exceptions_helper import WrongInputValueException, AlphaVantageApiException
+from helpers.profiler import NULL_PROFILER, PhaseProfiler
 
 
 class AplhaAdvantageRunner(object):
     def __init__(self, api_key: str, output_dest: str, output_format: str = 'json',
-                 output_size: str = 'compact', verbose: bool = False):
+                 output_size: str = 'compact', verbose: bool = False, transport=None, base_url: str = None,
+                 profiler: PhaseProfiler = None, prefetcher: Prefetcher = None):
         """ Initialize the class
         :param api_key:
         :param output_dest:
         :param output_format:
         :param output_size:
+        :param transport: passed to `AlphaVantage`, to record or replay the session.
+        :param base_url: passed to `AlphaVantage`, e.g. to use a local proxy.
+        :param profiler: times the session phases, shared with the client.
+        :param prefetcher: fetches the likely next requests once a company is selected, only useful with a
+            caching transport.
         """
-        self.alpha_vantage = AlphaVantage(key=api_key, output_format=output_format, output_size=output_size)
+        self.profiler = profiler or NULL_PROFILER
+        self._client_kwargs = dict(key=api_key, output_format=output_format, output_size=output_size,
+                                   transport=transport, base_url=base_url, profiler=self.profiler)
+        self._alpha_vantage = None
         self.output_dest = output_dest
         self.verbose = verbose
+        self.prefetcher = prefetcher
+
+    @property
+    def alpha_vantage(self) -> AlphaVantage:
+        """ The client is created (and the api key checked) on first use, so the first prompt shows up
+        without waiting for the network.
+        :return:
+        """
+        if self._alpha_vantage is None:
+            self._alpha_vantage = AlphaVantage(**self._client_kwargs)
+        return self._alpha_vantage
 
     def run(self):
         """ Run the interactive cli applciation.
@@ -29,14 +52,16 @@ class AplhaAdvantageRunner(object):
         while True:
             # first, search companies
             result = self._search()
-            print('{:*^40}'.format('Search Result'))
-            for i, entry in enumerate(result):
-                print('{:>2}.{:<20}{}'.format(i + 1, entry['1. symbol'], entry['2. name']))
+            with self.profiler.phase('transform'):
+                print('{:*^40}'.format('Search Result'))
+                for i, entry in enumerate(result):
+                    print('{:>2}.{:<20}{}'.format(i + 1, entry['1. symbol'], entry['2. name']))
 
             # select a company to perform further analysis
             index = input("Select a company number, or (q) to exit:\n")
             index = self.__parse_input(index, len(result))
             company = result[index - 1]
+            self._prefetch(symbol=company['1. symbol'])
 
             option = input("Select an action, or (q) to exit:\n"
                            "1. Display additional details in grid.\n"
@@ -65,12 +90,33 @@ class AplhaAdvantageRunner(object):
             if option == 'q':
                 exit()
 
+    def _user_request(self):
+        """ Wrap the requests the user waits for, the prefetcher yields to them.
+        :return:
+        """
+        return self.prefetcher.user_request() if self.prefetcher else nullcontext()
+
+    def _prefetch(self, symbol: str) -> None:
+        """ Fetch the current quote and the daily series of the selected company in the background, with the same
+        arguments as the menu actions, so they are answered from the cache if chosen.
+        :param symbol:
+        :return:
+        """
+        if self.prefetcher is None:
+            return None
+        self.prefetcher.schedule([
+            lambda: self.alpha_vantage.get_current_quote(symbol=symbol, force_json=True),
+            lambda: self.alpha_vantage.get_daily_timeseries(symbol=symbol),
+        ])
+        return None
+
     def _search(self) -> List[Dict[str, str]]:
         """ Use alpha vantage search api and display the result
         :return:
         """
         keyword = input("Enter a keyword\n")
-        result = self.alpha_vantage.search(keyword=keyword, force_json=True)
+        with self._user_request():
+            result = self.alpha_vantage.search(keyword=keyword, force_json=True)
         if len(result) == 0:
             print('No match found.')
             exit()
@@ -85,7 +131,8 @@ class AplhaAdvantageRunner(object):
         if interval not in AlphaVantageValues.TIME_INTERVALS_MAP:
             raise WrongInputValueException(extra=f'`interval` should be one of following: '
                                                  f'{AlphaVantageValues.TIME_INTERVALS_MAP}, {interval} is not accepted.')
-        result = self.alpha_vantage.get_intraday(symbol=symbol, interval=interval)
+        with self._user_request():
+            result = self.alpha_vantage.get_intraday(symbol=symbol, interval=interval)
         return result
 
     def _daily(self, symbol: str) -> Union[Dict, bytes]:
@@ -93,21 +140,24 @@ class AplhaAdvantageRunner(object):
         :param symbol:
         :return:
         """
-        return self.alpha_vantage.get_daily_timeseries(symbol=symbol)
+        with self._user_request():
+            return self.alpha_vantage.get_daily_timeseries(symbol=symbol)
 
     def _weekly(self, symbol: str) -> Union[Dict, bytes]:
         """ Get weekly time series data for a company according the given interval.
         :param symbol:
         :return:
         """
-        return self.alpha_vantage.get_weekly_timeseries(symbol=symbol)
+        with self._user_request():
+            return self.alpha_vantage.get_weekly_timeseries(symbol=symbol)
 
     def _monthly(self, symbol: str) -> Union[Dict, bytes]:
         """ Get monthly time series data for a company according the given interval.
         :param symbol:
         :return:
         """
-        return self.alpha_vantage.get_monthly_timeseries(symbol=symbol)
+        with self._user_request():
+            return self.alpha_vantage.get_monthly_timeseries(symbol=symbol)
 
     def _get_quote(self, symbol: str) -> Dict[str, str]:
         """ Get current quote for this company
@@ -116,7 +166,8 @@ class AplhaAdvantageRunner(object):
         """
         result = None
         try:
-            result = self.alpha_vantage.get_current_quote(symbol=symbol, force_json=True)
+            with self._user_request():
+                result = self.alpha_vantage.get_current_quote(symbol=symbol, force_json=True)
         except AlphaVantageApiException:
             print('No quote found.')
         return result
@@ -147,15 +198,17 @@ class AplhaAdvantageRunner(object):
 
         result = None
         try:
-            result = self.alpha_vantage.get_ema(symbol=symbol, interval=interval, series_type=series_type,
-                                                time_period=time_period, force_json=True)
+            with self._user_request():
+                result = self.alpha_vantage.get_ema(symbol=symbol, interval=interval, series_type=series_type,
+                                                    time_period=time_period, force_json=True)
         except AlphaVantageApiException:
             print('No data found.')
         formatted_results = None
         if result:
-            formatted_results = {}
-            for key, value in result.items():
-                formatted_results[key] = value[AlphaVantageFunctions.EMA]
+            with self.profiler.phase('transform'):
+                formatted_results = {}
+                for key, value in result.items():
+                    formatted_results[key] = value[AlphaVantageFunctions.EMA]
         return formatted_results
 
     def _display_historical_prices(self, symbol: str) -> None:
@@ -188,19 +241,19 @@ class AplhaAdvantageRunner(object):
                                          result=result)
         return None
 
-    @staticmethod
-    def __display_dictionary_info(dict_object: Dict[str, str], sub: bool = True) -> None:
+    def __display_dictionary_info(self, dict_object: Dict[str, str], sub: bool = True) -> None:
         """
 
         :param dict_object:
         :param sub: True if key needs cleaning (remove ordered numbers 1., 2. .. etc)
         :return:
         """
-        for key, value in dict_object.items():
-            if sub:
-                print('{:<20}{}'.format(re.sub("[^a-zA-Z]", "", key), value))
-            else:
-                print('{:<20}{}'.format(key, value))
+        with self.profiler.phase('transform'):
+            for key, value in dict_object.items():
+                if sub:
+                    print('{:<20}{}'.format(re.sub("[^a-zA-Z]", "", key), value))
+                else:
+                    print('{:<20}{}'.format(key, value))
         return None
 
     def __print_and_save_result(self, symbol: str, interval: str, result: Union[Dict, bytes]):
@@ -214,7 +267,7 @@ class AplhaAdvantageRunner(object):
         if self.alpha_vantage.output_format == 'json':
             timestamp = time.time()
             file_name = os.path.join(self.output_dest, f'{symbol}_{interval}_{timestamp}.json')
-            with open(file_name, "w") as outfile:
+            with self.profiler.phase('persist'), open(file_name, "w") as outfile:
                 json.dump(result, outfile, indent=4, sort_keys=True)
             if self.verbose and self.alpha_vantage.output_format == 'json':
                 for key, value in result.items():
@@ -223,8 +276,8 @@ class AplhaAdvantageRunner(object):
 
         elif self.alpha_vantage.output_format == 'csv':
             timestamp = time.time()
-            file_name = os.path.join(self.output_dest, f'{symbol}_{type}_{timestamp}.csv')
-            with open(file_name, "wb") as outfile:
+            file_name = os.path.join(self.output_dest, f'{symbol}_{interval}_{timestamp}.csv')
+            with self.profiler.phase('persist'), open(file_name, "wb") as outfile:
                 outfile.write(result)
         return None
 
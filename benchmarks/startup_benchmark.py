@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+FIRST_PROMPT = 'Enter a keyword'
+
+
+def _run(args: List[str], **kwargs) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True, text=True, check=True, **kwargs)
+
+
+def interpreter_startup() -> float:
+    """ Seconds to start an empty interpreter, the floor of every other measure.
+    :return:
+    """
+    started_at = time.perf_counter()
+    _run(['-c', 'pass'])
+    return time.perf_counter() - started_at
+
+
+def import_time(module: str = 'main') -> float:
+    """ Seconds spent importing the module and its dependencies, as reported by `-X importtime`.
+    :param module:
+    :return:
+    """
+    stderr = _run(['-X', 'importtime', '-c', f'import {module}']).stderr
+    for line in reversed(stderr.splitlines()):
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1e6
+    raise RuntimeError(f'No import time reported for {module}.')
+
+
+def time_to_first_prompt(api_key: str = 'BENCHMARK_KEY') -> float:
+    """ Seconds from launching the cli until it asks for the first keyword.
+    :param api_key:
+    :return:
+    """
+    env = dict(os.environ, PYTHONUNBUFFERED='1')
+    started_at = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-m', 'main', '-k', api_key], cwd=ROOT, env=env, text=True,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        output = ''
+        while FIRST_PROMPT not in output:
+            char = process.stdout.read(1)
+            if not char:
+                raise RuntimeError(f'The cli exited before prompting: {output}')
+            output += char
+        return time.perf_counter() - started_at
+    finally:
+        process.kill()
+        process.wait()
+
+
+def run(repeat: int) -> Dict[str, Dict[str, float]]:
+    """ Run every measure `repeat` times.
+    :param repeat:
+    :return: measure -> {min, median}
+    """
+    measures = {
+        'interpreter_startup': interpreter_startup,
+        'import_main': import_time,
+        'time_to_first_prompt': time_to_first_prompt,
+    }
+    result = {}
+    for name, measure in measures.items():
+        samples = [measure() for _ in range(repeat)]
+        result[name] = {'min': min(samples), 'median': statistics.median(samples)}
+    return result
+
+
+def get_arg_parser():
+    arg_parser = argparse.ArgumentParser(description='Alpha Vantage cli startup benchmark')
+    arg_parser.add_argument('-n',
+                            '--repeat',
+                            type=int,
+                            default=10,
+                            help="Number of runs of each measure.")
+    arg_parser.add_argument('--history',
+                            type=str,
+                            required=False,
+                            help="Append the results as a json line to this file, to track them over time.")
+    return arg_parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = get_arg_parser()
+    results = run(repeat=args.repeat)
+    print('{:<24}{:>12}{:>12}'.format('measure (ms)', 'min', 'median'))
+    for name, values in results.items():
+        print('{:<24}{:>12.1f}{:>12.1f}'.format(name, values['min'] * 1000, values['median'] * 1000))
+    if args.history:
+        with open(args.history, 'a') as outfile:
+            outfile.write(json.dumps({'timestamp': time.time(), 'python': sys.version.split()[0],
+                                      'results': results}) + '\n')
@@ -1,6 +1,12 @@
 DEFAULT_OUTPUT_FOLDER = 'output'
 ALPHA_VANTAGE_BASE_URL = 'https://www.alphavantage.co'
 GRACE_PERIOD = 20  # 20 second between each test, because the alpha vantage api allows only 5 requests per 1 minute
+API_RATE_LIMITS = ((5, 60), (500, 24 * 60 * 60))  # (max requests, period in seconds): 5 per minute, 500 per day
+DEFAULT_PROXY_HOST = '127.0.0.1'
+DEFAULT_PROXY_PORT = 8765
+DEFAULT_PROXY_QUEUE_TIMEOUT = 5  # seconds a proxy request may wait for the rate limiter
+DEFAULT_CACHE_MAX_ENTRIES = 1000  # responses kept in memory, full histories can weigh several megabytes each
+DEFAULT_CACHE_SWEEP_INTERVAL = 60  # seconds between two removals of the expired responses
 
 
 class AlphaVantageKeys(object):
@@ -27,3 +33,20 @@ class AlphaVantageValues(object):
     SERIES_TYPE_MAP = ['close', 'open', 'high', 'low']
     OUTPUT_SIZE = ['compact', 'full']
     OUTPUT_FORMAT = ['json', 'csv']
+
+
+class AlphaVantageCacheTtl(object):
+    """ Seconds a response stays fresh in the cache, per function.
+    """
+    DEFAULT = 60
+    # a market session learned from a search is trusted that long, its utc offset changes with daylight saving time
+    MARKET_SESSION = 24 * 60 * 60
+    FUNCTIONS = {
+        AlphaVantageFunctions.SEARCH: 24 * 60 * 60,
+        AlphaVantageFunctions.CURRENT_QOUTE: 60,
+        AlphaVantageFunctions.INTRADAY: 60,
+        AlphaVantageFunctions.EMA: 60 * 60,
+        AlphaVantageFunctions.DAILY: 60 * 60,
+        AlphaVantageFunctions.WEEKLY: 6 * 60 * 60,
+        AlphaVantageFunctions.MONTHLY: 24 * 60 * 60,
+    }
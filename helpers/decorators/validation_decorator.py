@@ -2,6 +2,7 @@ from functools import wraps
 
 from constants import AlphaVantageKeys, AlphaVantageValues
 from helpers.custom_exceptions_helper import WrongInputValueException, AlphaVantageApiException
+from helpers.profiler import get_profiler
 
 
 def validate_interval(func):
@@ -53,21 +54,23 @@ def validate_result(func):
     @wraps(func)
     def _validate_result_wrapper(*args, **kwargs):
         result = func(*args, **kwargs)
-        data = None
-        if isinstance(result, dict):
-            data = result.keys()
-        elif isinstance(result, bytes):
-            data = result.decode("utf-8")
-        if data:
-            if AlphaVantageKeys.ERR_KEY in data:
-                raise AlphaVantageApiException(extra={
-                    'api': func.__name__,
-                    'passed_args': kwargs,
-                })
-            elif AlphaVantageKeys.NOTE_KEY in data:
-                raise AlphaVantageApiException(extra={
-                    'message': 'Api limit exceeded per minute (5 times) or per day (500 times).'
-                })
+        # args[0] is the client, timed as its `validate` phase when profiling
+        with get_profiler(args[0] if args else None).phase('validate'):
+            data = None
+            if isinstance(result, dict):
+                data = result.keys()
+            elif isinstance(result, bytes):
+                data = result.decode("utf-8")
+            if data:
+                if AlphaVantageKeys.ERR_KEY in data:
+                    raise AlphaVantageApiException(extra={
+                        'api': func.__name__,
+                        'passed_args': kwargs,
+                    })
+                elif AlphaVantageKeys.NOTE_KEY in data:
+                    raise AlphaVantageApiException(extra={
+                        'message': 'Api limit exceeded per minute (5 times) or per day (500 times).'
+                    })
         return result
 
     return _validate_result_wrapper
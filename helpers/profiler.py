@@ -0,0 +1,103 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+PHASES = ('network', 'decode', 'validate', 'transform', 'persist')
+
+
+class NullProfiler(object):
+    """ Used when profiling is off, records nothing.
+    """
+
+    @contextmanager
+    def phase(self, name: str):
+        yield
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class PhaseProfiler(object):
+    """ Accumulates the time spent in each phase of a session (network, decode, validate, transform, persist),
+    and optionally runs cProfile over the whole session.
+    """
+
+    def __init__(self, cprofile: bool = False):
+        """ Initialize the class
+        :param cprofile: also collect a cProfile of the thread calling `start`.
+        """
+        self._timings = {phase: [0.0, 0] for phase in PHASES}  # phase -> [seconds, calls]
+        self._lock = threading.Lock()
+        self._profile = None
+        if cprofile:
+            import cProfile
+            self._profile = cProfile.Profile()
+        self._started_at = None
+        self.elapsed = 0.0
+
+    @contextmanager
+    def phase(self, name: str):
+        """ Time the block as part of the given phase.
+        :param name: one of PHASES, other names are kept as extra phases.
+        :return:
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - started_at
+            with self._lock:
+                timing = self._timings.setdefault(name, [0.0, 0])
+                timing[0] += duration
+                timing[1] += 1
+
+    def start(self) -> None:
+        self._started_at = time.perf_counter()
+        if self._profile is not None:
+            self._profile.enable()
+        return None
+
+    def stop(self) -> None:
+        if self._profile is not None:
+            self._profile.disable()
+        if self._started_at is not None:
+            self.elapsed += time.perf_counter() - self._started_at
+            self._started_at = None
+        return None
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """ Seconds and number of calls per phase.
+        :return:
+        """
+        with self._lock:
+            return {name: {'seconds': seconds, 'calls': calls} for name, (seconds, calls) in self._timings.items()}
+
+    def report(self) -> str:
+        """ A table of the phases, with the share of the session each one took.
+        :return:
+        """
+        lines = ['{:*^52}'.format('Profile'), '{:<12}{:>8}{:>14}{:>10}'.format('phase', 'calls', 'seconds', 'share')]
+        for name, timing in self.summary().items():
+            share = timing['seconds'] / self.elapsed if self.elapsed else 0.0
+            lines.append('{:<12}{:>8}{:>14.4f}{:>9.1%}'.format(name, timing['calls'], timing['seconds'], share))
+        lines.append('{:<12}{:>8}{:>14.4f}'.format('session', '', self.elapsed))
+        return '\n'.join(lines)
+
+    def dump_stats(self, file_name: str) -> None:
+        """ Write the cProfile stats, readable by pstats, snakeviz or flameprof (to draw a flamegraph).
+        :param file_name:
+        :return:
+        """
+        if self._profile is None:
+            raise ValueError('cProfile was not enabled, use `PhaseProfiler(cprofile=True)`.')
+        self._profile.dump_stats(file_name)
+        return None
+
+
+def get_profiler(obj) -> 'PhaseProfiler':
+    """ The profiler attached to an object (e.g. an `AlphaVantage` instance), the null profiler if none.
+    :param obj:
+    :return:
+    """
+    return getattr(obj, 'profiler', None) or NULL_PROFILER
@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional, Sequence, Tuple
+
+from constants import API_RATE_LIMITS
+
+
+class RateLimiter(object):
+    """ Thread safe sliding window limiter, enforcing several limits at once (e.g. per minute and per day).
+    """
+
+    def __init__(self, limits: Sequence[Tuple[int, float]] = API_RATE_LIMITS):
+        """ Initialize the class
+        :param limits: (max calls, period in seconds) pairs
+        """
+        self.limits = tuple(limits)
+        self._calls = [deque() for _ in self.limits]
+        self._lock = threading.Lock()
+        # set while a thread runs with a slot taken ahead by `prepaid`
+        self._local = threading.local()
+
+    def _wait_time(self, now: float) -> float:
+        """ Seconds to wait before a call is allowed, must hold the lock.
+        :param now:
+        :return:
+        """
+        wait = 0.0
+        for (max_calls, period), calls in zip(self.limits, self._calls):
+            while calls and calls[0] <= now - period:
+                calls.popleft()
+            if len(calls) >= max_calls:
+                wait = max(wait, calls[0] + period - now)
+        return wait
+
+    def _available(self, now: float) -> int:
+        """ Number of calls that can be made at the given time, must hold the lock.
+        :param now:
+        :return:
+        """
+        self._wait_time(now)
+        return min(max_calls - len(calls) for (max_calls, _), calls in zip(self.limits, self._calls))
+
+    def available(self) -> int:
+        """ Number of calls that can be made right now.
+        :return:
+        """
+        with self._lock:
+            return self._available(time.monotonic())
+
+    def try_acquire(self, reserve: int = 0) -> bool:
+        """ Take a call slot if one is free, without waiting.
+        :param reserve: slots that must be left free, e.g. for more urgent callers.
+        :return:
+        """
+        return self._try_take(reserve) is not None
+
+    def _try_take(self, reserve: int) -> Optional[float]:
+        """ Take a slot if more than `reserve` are free, checked and taken at once.
+        :param reserve:
+        :return: the time the slot was taken at, None if not taken
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._available(now) <= reserve:
+                return None
+            for calls in self._calls:
+                calls.append(now)
+            return now
+
+    @contextmanager
+    def prepaid(self, reserve: int = 0):
+        """ Take a slot ahead, if more than `reserve` are free. The next `acquire` of this thread within the block
+        uses it instead of taking another one, and it is given back if unused when the block ends.
+        :param reserve:
+        :return: whether the slot was taken
+        """
+        taken_at = self._try_take(reserve)
+        if taken_at is None:
+            yield False
+            return
+        self._local.prepaid = True
+        try:
+            yield True
+        finally:
+            if getattr(self._local, 'prepaid', False):
+                self._local.prepaid = False
+                with self._lock:
+                    for calls in self._calls:
+                        if taken_at in calls:
+                            calls.remove(taken_at)
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """ Wait for a call slot and take it.
+        :param timeout: seconds to wait at most, None waits as long as needed.
+        :return: False if no slot was free within the timeout.
+        """
+        if getattr(self._local, 'prepaid', False):
+            self._local.prepaid = False
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._wait_time(now)
+                if wait <= 0:
+                    for calls in self._calls:
+                        calls.append(now)
+                    return True
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
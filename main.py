@@ -1,8 +1,15 @@
 import argparse
 import os
+import sys
 
+from alpha_vantage.cache import CachingTransport
+from alpha_vantage.market_session import MarketCalendar, MarketSessionRefreshPolicy
+from alpha_vantage.prefetch import Prefetcher
+from alpha_vantage.transport import RateLimitedTransport, RecordingTransport, ReplayTransport
 from alpha_vantage_runner import AplhaAdvantageRunner
 from constants import DEFAULT_OUTPUT_FOLDER
+from helpers.profiler import PhaseProfiler
+from helpers.rate_limiter import RateLimiter
 
 
 def get_arg_parser():
@@ -44,6 +51,60 @@ def get_arg_parser():
                             action='store_true',
                             help="Print the output to the console of json apis in the console.")
 
+    arg_parser.add_argument('-b',
+                            '--base-url',
+                            type=str,
+                            required=False,
+                            help="Send the api requests to this url instead of alpha vantage, e.g. a local proxy "
+                                 "started with `python -m alpha_vantage.proxy` (http://127.0.0.1:8765).")
+
+    arg_parser.add_argument('-c',
+                            '--cache',
+                            action='store_true',
+                            help="Keep the api results in memory during the session. Quotes and intraday results are "
+                                 "not asked again while the market of the symbol is closed, daily results expire at the "
+                                 "session close.")
+    arg_parser.add_argument('-p',
+                            '--prefetch',
+                            action='store_true',
+                            help="Implies `--cache`. Once a company is selected, fetch its current quote and daily "
+                                 "series in the background with the spare usage quota, so these actions answer "
+                                 "instantly.")
+    arg_parser.add_argument('--holidays',
+                            type=str,
+                            required=False,
+                            help="With `--cache`, json file of market holidays, region (as in the search results) to "
+                                 "a list of YYYY-MM-DD dates.")
+
+    arg_parser.add_argument('--profile',
+                            type=str,
+                            nargs='?',
+                            const='',
+                            metavar='PROF_FILE',
+                            help="Time the session phases (network, decode, validate, transform, persist) and print "
+                                 "them on exit. If a file is provided, also write cProfile stats there, readable by "
+                                 "pstats, snakeviz or flameprof.")
+
+    transport_group = arg_parser.add_mutually_exclusive_group()
+    transport_group.add_argument('--record',
+                                 type=str,
+                                 required=False,
+                                 metavar='ARCHIVE',
+                                 help="Record the api requests (api key redacted), responses and timings of the session "
+                                      "into a gzipped archive, e.g. `session.jsonl.gz`.")
+    transport_group.add_argument('--replay',
+                                 type=str,
+                                 required=False,
+                                 metavar='ARCHIVE',
+                                 help="Serve the api responses from an archive written with `--record`, "
+                                      "without any network.")
+    arg_parser.add_argument('--replay-speed',
+                            type=float,
+                            required=False,
+                            help="With `--replay`, replay the recorded gaps and latency at this speed (1 is the "
+                                 "original pace, 2 is twice as fast). If not provided, responses are served "
+                                 "immediately.")
+
     return arg_parser.parse_args()
 
 
@@ -63,6 +124,38 @@ if __name__ == "__main__":
         if not os.path.isdir(output_dest):
             os.mkdir(output_dest)
 
-    av_runner = AplhaAdvantageRunner(api_key=api_key, output_format=output_format, output_size=output_size,
-                                     output_dest=output_dest, verbose=args.verbose)
-    av_runner.run()
+    transport = recorder = None
+    if args.record:
+        transport = recorder = RecordingTransport(archive_path=args.record)
+    elif args.replay:
+        transport = ReplayTransport(archive_path=args.replay, speed=args.replay_speed)
+    prefetcher = None
+    if args.prefetch:
+        # user and prefetch requests share the quota, the prefetcher only uses what the user leaves
+        rate_limiter = RateLimiter()
+        transport = RateLimitedTransport(rate_limiter=rate_limiter, transport=transport)
+        prefetcher = Prefetcher(rate_limiter=rate_limiter).start()
+    if args.cache or args.prefetch:
+        refresh_policy = MarketSessionRefreshPolicy(calendar=MarketCalendar(holidays_file=args.holidays))
+        transport = CachingTransport(transport=transport, refresh_policy=refresh_policy)
+
+    profiler = None
+    if args.profile is not None:
+        profiler = PhaseProfiler(cprofile=bool(args.profile))
+        profiler.start()
+
+    try:
+        av_runner = AplhaAdvantageRunner(api_key=api_key, output_format=output_format, output_size=output_size,
+                                         output_dest=output_dest, verbose=args.verbose, transport=transport,
+                                         base_url=args.base_url, profiler=profiler, prefetcher=prefetcher)
+        av_runner.run()
+    finally:
+        if prefetcher is not None:
+            prefetcher.stop()
+        if recorder is not None:
+            recorder.close()
+        if profiler is not None:
+            profiler.stop()
+            print(profiler.report(), file=sys.stderr)
+            if args.profile:
+                profiler.dump_stats(args.profile)
@@ -8,10 +8,16 @@ from typing import Dict, Union
 from dateutil.parser import parse
 
 from alpha_vantage.alpha_vantage import AlphaVantage
+from alpha_vantage.transport import RecordingTransport, ReplayTransport
 from constants import DEFAULT_OUTPUT_FOLDER, GRACE_PERIOD
 from helpers.custom_exceptions_helper import WrongInputValueException, AlphaVantageApiException
 
 
+# set one of them to an archive path, to record a live run, or to run the tests offline from a recording
+RECORD_ENV = 'ALPHA_VANTAGE_RECORD'
+REPLAY_ENV = 'ALPHA_VANTAGE_REPLAY'
+
+
 class AlphaVantageTest(unittest.TestCase):
 
     @classmethod
@@ -23,7 +29,12 @@ class AlphaVantageTest(unittest.TestCase):
         cls._OUTPUT_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), DEFAULT_OUTPUT_FOLDER)
         os.mkdir(cls._OUTPUT_PATH)
         cls._API_KEY = 'TEST_API_KEY'
-        cls.alpha_vantage = AlphaVantage(key=cls._API_KEY, output_format='csv')
+        cls._TRANSPORT = None
+        if os.environ.get(REPLAY_ENV):
+            cls._TRANSPORT = ReplayTransport(archive_path=os.environ[REPLAY_ENV])
+        elif os.environ.get(RECORD_ENV):
+            cls._TRANSPORT = RecordingTransport(archive_path=os.environ[RECORD_ENV])
+        cls.alpha_vantage = AlphaVantage(key=cls._API_KEY, output_format='csv', transport=cls._TRANSPORT)
 
     def test_search_api(self):
         """ Test search api
@@ -222,8 +233,9 @@ class AlphaVantageTest(unittest.TestCase):
         This is run after each test run
         :return:
         """
-
-        time.sleep(GRACE_PERIOD)
+        # no usage limit when the responses are replayed
+        if not isinstance(self._TRANSPORT, ReplayTransport):
+            time.sleep(GRACE_PERIOD)
 
     @classmethod
     def tearDownClass(cls) -> None:
@@ -233,3 +245,5 @@ class AlphaVantageTest(unittest.TestCase):
         """
         # remove the created folder
         shutil.rmtree(cls._OUTPUT_PATH)
+        if isinstance(cls._TRANSPORT, RecordingTransport):
+            cls._TRANSPORT.close()
@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from alpha_vantage.alpha_vantage import AlphaVantage
+from alpha_vantage.analytics import SymbolScreener, load_stored_series, list_stored_symbols, rolling_returns, \
+    rolling_volatility, exponential_moving_average
+from alpha_vantage_runner import AplhaAdvantageRunner
+from helpers.custom_exceptions_helper import WrongInputValueException
+
+
+def _store_daily(output_path: str, symbol: str, closes: list, days: list = None) -> None:
+    """ Store a daily series the same way the runner does.
+    """
+    result = {}
+    for day, close in zip(days or range(1, len(closes) + 1), closes):
+        result[f'2021-04-{day:02d}'] = {'1. open': str(close), '2. high': str(close), '3. low': str(close),
+                                        '4. close': str(close), '5. volume': '100'}
+    with open(os.path.join(output_path, f'{symbol}_daily_1629990699.0.json'), 'w') as outfile:
+        json.dump(result, outfile)
+
+
+class AnalyticsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Store a few daily series the same way the runner does.
+        :return:
+        """
+        cls._OUTPUT_PATH = tempfile.mkdtemp()
+        closes = {
+            'AAA': [10.0, 11.0, 12.0, 11.0, 13.0, 14.0],
+            'BBB': [20.0, 22.0, 24.0, 22.0, 26.0, 28.0],
+            'CCC': [30.0, 29.0, 28.0, 29.0, 27.0, 26.0],
+        }
+        for symbol, values in closes.items():
+            _store_daily(cls._OUTPUT_PATH, symbol, values)
+        cls.screener = SymbolScreener(output_dest=cls._OUTPUT_PATH, interval='daily', workers=2)
+
+    def test_load_stored_series(self):
+        """ Test loading a stored series, the timestamps should be sorted and the values parsed.
+        :return:
+        """
+        self.assertEqual(list_stored_symbols(self._OUTPUT_PATH, 'daily'), ['AAA', 'BBB', 'CCC'])
+        series = load_stored_series(output_dest=self._OUTPUT_PATH, symbol='AAA', interval='daily')
+        self.assertEqual(series.columns, ['open', 'high', 'low', 'close', 'volume'])
+        self.assertTrue(np.all(np.diff(series.timestamps) > np.timedelta64(0, 's')))
+        self.assertEqual(series.column('close')[-1], 14.0)
+        self.assertRaises(FileNotFoundError, load_stored_series, self._OUTPUT_PATH, 'AAA', 'weekly')
+
+    def test_indicators(self):
+        """ Test the vectorized computations against hand computed values.
+        :return:
+        """
+        prices = np.array([10.0, 11.0, 12.0, 11.0])
+        np.testing.assert_allclose(rolling_returns(prices, 2), [0.2, 0.0])
+        np.testing.assert_allclose(rolling_volatility(prices, 3), [np.std([0.1, 1 / 11, -1 / 12], ddof=1)])
+        np.testing.assert_allclose(exponential_moving_average(prices, 3), [10.0, 10.5, 11.25, 11.125])
+
+    def test_screen_and_correlation(self):
+        """ Test the screening and the correlation matrix over the process pool.
+        :return:
+        """
+        metrics = self.screener.metrics(window=2, ema_period=3)
+        self.assertEqual(set(metrics.keys()), {'AAA', 'BBB', 'CCC'})
+        self.assertAlmostEqual(metrics['AAA']['return'], 14.0 / 13.0 * 13.0 / 11.0 - 1.0)
+
+        rising = self.screener.screen({'return': (0.0, None)}, window=2, ema_period=3)
+        self.assertEqual(set(rising.keys()), {'AAA', 'BBB'})
+
+        symbols, matrix = self.screener.correlation_matrix()
+        self.assertEqual(symbols, ['AAA', 'BBB', 'CCC'])
+        self.assertAlmostEqual(matrix[0, 1], 1.0)
+        self.assertLess(matrix[0, 2], 0.0)
+
+    def test_correlation_with_missing_bars(self):
+        """ Test the returns are computed over the shared timestamps, when a symbol misses a bar.
+        :return:
+        """
+        output_path = tempfile.mkdtemp()
+        try:
+            _store_daily(output_path, 'AAA', [10.0, 11.0, 12.0, 11.0, 13.0, 14.0])
+            # closed on the 3rd, the same prices otherwise
+            _store_daily(output_path, 'DDD', [20.0, 22.0, 22.0, 26.0, 28.0], days=[1, 2, 4, 5, 6])
+            screener = SymbolScreener(output_dest=output_path, interval='daily', workers=1)
+            symbols, matrix = screener.correlation_matrix()
+            self.assertEqual(symbols, ['AAA', 'DDD'])
+            self.assertAlmostEqual(matrix[0, 1], 1.0)
+
+            # no shared date at all
+            _store_daily(output_path, 'EEE', [30.0, 31.0, 32.0], days=[20, 21, 22])
+            self.assertRaises(WrongInputValueException, screener.correlation_matrix, symbols=['AAA', 'EEE'])
+        finally:
+            shutil.rmtree(output_path)
+
+    def test_load_runner_csv(self):
+        """ Test a csv result saved by the runner is found and parsed.
+        :return:
+        """
+        output_path = tempfile.mkdtemp()
+        try:
+            runner = AplhaAdvantageRunner(api_key='KEY', output_dest=output_path, output_format='csv')
+            runner._alpha_vantage = AlphaVantage(key='KEY', output_format='csv', validate_key=False)
+            content = b'timestamp,open,high,low,close,volume\r\n' \
+                      b'2021-04-02,11,11,11,11,100\r\n2021-04-01,10,10,10,10,100\r\n'
+            runner._AplhaAdvantageRunner__print_and_save_result(symbol='IBM', interval='daily', result=content)
+
+            self.assertEqual(list_stored_symbols(output_path, 'daily'), ['IBM'])
+            series = load_stored_series(output_dest=output_path, symbol='IBM', interval='daily')
+            self.assertEqual(series.column('close').tolist(), [10.0, 11.0])
+        finally:
+            shutil.rmtree(output_path)
+
+    def test_intraday_volatility_is_annualized(self):
+        """ Test intraday volatility is annualized from the bars per session, comparable to the daily one.
+        :return:
+        """
+        output_path = tempfile.mkdtemp()
+        try:
+            closes = [10.0, 11.0, 12.0, 11.0, 13.0, 14.0, 13.0, 12.0]
+            result = {}
+            for i, close in enumerate(closes):
+                result[f'2021-04-0{1 + i // 4} 10:{i % 4:02d}:00'] = {'1. open': str(close), '2. high': str(close),
+                                                                     '3. low': str(close), '4. close': str(close),
+                                                                     '5. volume': '100'}
+            with open(os.path.join(output_path, 'IBM_1min_1629990699.0.json'), 'w') as outfile:
+                json.dump(result, outfile)
+            screener = SymbolScreener(output_dest=output_path, interval='1min', workers=1)
+            metrics = screener.metrics(window=3, ema_period=3)
+            self.assertAlmostEqual(metrics['IBM']['volatility'],
+                                   rolling_volatility(np.array(closes), 3, 4 * 252)[-1])
+        finally:
+            shutil.rmtree(output_path)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls._OUTPUT_PATH)
@@ -0,0 +1,73 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from alpha_vantage.analytics import exponential_moving_average
+from alpha_vantage.backtest import Backtester, best, crossover_grid, run_crossover
+
+
+class BacktestTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        generator = np.random.default_rng(7)
+        cls.prices = 100.0 * np.cumprod(1.0 + generator.normal(0.0, 0.01, 400))
+
+    def _loop_backtest(self, fast: int, slow: int, cost: float) -> float:
+        """ Bar by bar reference implementation, total return of a long only crossover.
+        """
+        fast_ema = exponential_moving_average(self.prices, fast)
+        slow_ema = exponential_moving_average(self.prices, slow)
+        equity, previous = 1.0, 0.0
+        for i in range(len(self.prices) - 1):
+            position = 1.0 if i >= slow and fast_ema[i] > slow_ema[i] else 0.0
+            equity *= 1.0 + position * (self.prices[i + 1] / self.prices[i] - 1.0) - cost * abs(position - previous)
+            previous = position
+        return equity - 1.0
+
+    def test_matches_loop(self):
+        """ Test the vectorized backtest gives the same result as a loop over the bars.
+        :return:
+        """
+        result = run_crossover(self.prices, np.array([1, 5, 10]), np.array([20, 30, 50]), cost=0.001)
+        for i, (fast, slow) in enumerate([(1, 20), (5, 30), (10, 50)]):
+            self.assertAlmostEqual(result['total_return'][i], self._loop_backtest(fast, slow, 0.001))
+        self.assertTrue(np.all(result['max_drawdown'] <= 0))
+
+    def test_periods_per_year(self):
+        """ Test intraday series are annualized from their bars per session, not as daily bars.
+        :return:
+        """
+        output_path = tempfile.mkdtemp()
+        try:
+            result = {}
+            for day in ('2021-08-23', '2021-08-24'):
+                for minute in range(4):
+                    close = str(100.0 + minute)
+                    result[f'{day} 09:3{minute}:00'] = {'1. open': close, '2. high': close, '3. low': close,
+                                                        '4. close': close, '5. volume': '100'}
+            with open(os.path.join(output_path, 'IBM_1min_1629990699.0.json'), 'w') as outfile:
+                json.dump(result, outfile)
+            self.assertEqual(Backtester.from_stored(output_path, 'IBM', '1min').periods_per_year, 4 * 252)
+            self.assertEqual(Backtester.from_result(result, interval='1min').periods_per_year, 4 * 252)
+            self.assertEqual(Backtester.from_result(result).periods_per_year, 252)
+        finally:
+            shutil.rmtree(output_path)
+
+    def test_sweep(self):
+        """ Test the parallel sweep gives the same results as the in process run.
+        :return:
+        """
+        fast, slow = crossover_grid(range(1, 20), range(10, 60, 5))
+        self.assertTrue(np.all(fast < slow))
+        expected = Backtester(self.prices, workers=1).run(fast, slow)
+        result = Backtester(self.prices, workers=2).sweep(range(1, 20), range(10, 60, 5), chunk_size=16)
+        np.testing.assert_allclose(result['sharpe'], expected['sharpe'])
+
+        top = best(result, key='total_return', top=3)
+        self.assertEqual(len(top), 3)
+        self.assertGreaterEqual(top[0]['total_return'], top[1]['total_return'])
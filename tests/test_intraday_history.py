@@ -0,0 +1,89 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import date
+from urllib.parse import urlsplit, parse_qs
+
+from alpha_vantage.alpha_vantage import AlphaVantage
+from alpha_vantage.intraday_history import IntradayHistoryFetcher, month_slices
+from alpha_vantage.transport import Response
+from helpers.custom_exceptions_helper import AlphaVantageApiException
+from helpers.rate_limiter import RateLimiter
+
+
+class _MonthlyTransport(object):
+    """ Answers each month with two bars of that month, plus the first bar of the next month.
+    """
+
+    def __init__(self, failing_months=()):
+        self.months = []
+        self.failing_months = set(failing_months)
+        self._lock = threading.Lock()
+
+    def get(self, url: str, **kwargs):
+        params = parse_qs(urlsplit(url).query)
+        month = params['month'][0]
+        with self._lock:
+            self.months.append(month)
+        if month in self.failing_months:
+            return Response(content=json.dumps({'Note': 'Api limit exceeded'}).encode('utf-8'))
+        year, number = int(month[:4]), int(month[5:])
+        next_month = f'{year + number // 12:04d}-{number % 12 + 1:02d}'
+        bar = {'1. open': '1', '2. high': '1', '3. low': '1', '4. close': month, '5. volume': '1'}
+        series = {f'{month}-02 09:31:00': bar, f'{month}-01 09:30:00': bar, f'{next_month}-01 09:30:00': bar}
+        return Response(content=json.dumps({f'Time Series ({params["interval"][0]})': series}).encode('utf-8'))
+
+
+class IntradayHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self._OUTPUT_PATH = tempfile.mkdtemp()
+
+    def _fetcher(self, transport) -> IntradayHistoryFetcher:
+        alpha_vantage = AlphaVantage(key='KEY', transport=transport, validate_key=False)
+        return IntradayHistoryFetcher(alpha_vantage=alpha_vantage, output_dest=self._OUTPUT_PATH,
+                                      rate_limiter=RateLimiter(limits=((100, 60),)), workers=3)
+
+    def test_month_slices(self):
+        self.assertEqual(month_slices('2020-11', '2021-02'), ['2020-11', '2020-12', '2021-01', '2021-02'])
+
+    def test_resume_and_merge(self):
+        """ Test an interrupted fetch keeps the finished months, and the next run only asks for the missing ones.
+        :return:
+        """
+        transport = _MonthlyTransport(failing_months=['2020-12'])
+        with self.assertRaises(AlphaVantageApiException):
+            self._fetcher(transport).fetch(symbol='IBM', interval='1min', start='2020-11', end='2021-02')
+        self.assertEqual(sorted(transport.months), ['2020-11', '2020-12', '2021-01', '2021-02'])
+
+        transport = _MonthlyTransport()
+        file_name = self._fetcher(transport).fetch(symbol='IBM', interval='1min', start='2020-11', end='2021-02')
+        self.assertEqual(transport.months, ['2020-12'])
+
+        with open(file_name, 'r') as reader_file:
+            result = json.load(reader_file)
+        timestamps = list(result.keys())
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertEqual(len(timestamps), 8)
+        self.assertEqual((timestamps[0], timestamps[-1]), ('2020-11-01 09:30:00', '2021-02-02 09:31:00'))
+        self.assertTrue(os.path.basename(file_name).startswith('IBM_1min_'))
+
+    def test_current_month_is_not_checkpointed(self):
+        """ Test the still growing current month is written from the response, without a checkpoint.
+        :return:
+        """
+        current = date.today().strftime('%Y-%m')
+        previous = month_slices('2000-01', current)[-2]
+        fetcher = self._fetcher(_MonthlyTransport())
+        file_name = fetcher.fetch(symbol='IBM', interval='5min', start=previous, end=current)
+
+        with open(file_name, 'r') as reader_file:
+            result = json.load(reader_file)
+        self.assertEqual([timestamp[:7] for timestamp in result], [previous] * 2 + [current] * 2)
+        self.assertEqual(os.listdir(fetcher.checkpoint_dir('IBM', '5min')), [f'{previous}.json'])
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self._OUTPUT_PATH)
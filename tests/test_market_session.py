@@ -0,0 +1,120 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from alpha_vantage.cache import CachingTransport
+from alpha_vantage.market_session import MarketCalendar, MarketSession, MarketSessionRefreshPolicy, parse_utc_offset
+from alpha_vantage.transport import Response
+from constants import AlphaVantageFunctions
+
+SEARCH_RESULT = {'1. symbol': 'IBM', '2. name': 'International Business Machines Corp', '3. type': 'Equity',
+                 '4. region': 'United States', '5. marketOpen': '09:30', '6. marketClose': '16:00',
+                 '7. timezone': 'UTC-04', '8. currency': 'USD', '9. matchScore': '1.0000'}
+NEW_YORK = timezone(timedelta(hours=-4))
+
+
+def _at(*args) -> float:
+    """ Epoch seconds of a new york local time.
+    """
+    return datetime(*args, tzinfo=NEW_YORK).timestamp()
+
+
+class _SearchTransport(object):
+
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url: str, **kwargs):
+        self.calls += 1
+        return Response(content=json.dumps({'bestMatches': [SEARCH_RESULT]}).encode('utf-8'))
+
+
+class MarketSessionTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._OUTPUT_PATH = tempfile.mkdtemp()
+        holidays_file = os.path.join(cls._OUTPUT_PATH, 'holidays.json')
+        with open(holidays_file, 'w') as outfile:
+            json.dump({'United States': ['2021-09-06']}, outfile)
+        cls.calendar = MarketCalendar(holidays_file=holidays_file)
+        cls.calendar.register([SEARCH_RESULT])
+        cls.policy = MarketSessionRefreshPolicy(calendar=cls.calendar)
+
+    def test_parse_utc_offset(self):
+        self.assertEqual(parse_utc_offset('UTC-04'), timedelta(hours=-4))
+        self.assertEqual(parse_utc_offset('UTC+5.5'), timedelta(hours=5, minutes=30))
+        self.assertEqual(parse_utc_offset('UTC'), timedelta(0))
+
+    def test_session(self):
+        """ Test the session hours, weekends and holidays.
+        :return:
+        """
+        session = self.calendar.session_for('IBM')
+        self.assertIsInstance(session, MarketSession)
+        # friday 2021-08-27
+        self.assertTrue(session.is_open(_at(2021, 8, 27, 10, 0)))
+        self.assertFalse(session.is_open(_at(2021, 8, 27, 9, 0)))
+        self.assertFalse(session.is_open(_at(2021, 8, 28, 12, 0)))
+        self.assertEqual(session.next_open(_at(2021, 8, 27, 17, 0)), _at(2021, 8, 30, 9, 30))
+        # monday 2021-09-06 is a holiday
+        self.assertEqual(session.next_open(_at(2021, 9, 4, 12, 0)), _at(2021, 9, 7, 9, 30))
+
+    def test_refresh_policy(self):
+        """ Test nothing is refreshed while the market is closed, and daily results expire at the close.
+        :return:
+        """
+        quote = {'function': AlphaVantageFunctions.CURRENT_QOUTE, 'symbol': 'IBM'}
+        daily = {'function': AlphaVantageFunctions.DAILY, 'symbol': 'IBM'}
+        ema = {'function': AlphaVantageFunctions.EMA, 'symbol': 'IBM', 'interval': '5min'}
+
+        now = _at(2021, 8, 27, 10, 0)
+        self.assertEqual(self.policy.expires_at(quote, now), now + 60)
+        self.assertEqual(self.policy.expires_at(daily, now), _at(2021, 8, 27, 16, 0))
+        self.assertEqual(self.policy.expires_at(quote, _at(2021, 8, 27, 15, 59, 30)), _at(2021, 8, 27, 16, 0))
+
+        now = _at(2021, 8, 27, 17, 0)
+        self.assertEqual(self.policy.expires_at(quote, now), _at(2021, 8, 30, 9, 30))
+        self.assertEqual(self.policy.expires_at(ema, now), _at(2021, 8, 30, 9, 30))
+        self.assertEqual(self.policy.expires_at(daily, now), _at(2021, 8, 30, 16, 0))
+
+        # unknown symbols keep the fixed ttl
+        self.assertEqual(self.policy.expires_at(dict(quote, symbol='BA'), now), now + 60)
+
+    def test_stale_session_falls_back(self):
+        """ Test a session older than its lifetime is dropped, and the fixed ttl applies until the next search,
+        e.g. across a daylight saving time change.
+        :return:
+        """
+        calendar = MarketCalendar()
+        calendar.register([SEARCH_RESULT], now=_at(2021, 11, 5, 12, 0))
+        policy = MarketSessionRefreshPolicy(calendar=calendar)
+        quote = {'function': AlphaVantageFunctions.CURRENT_QOUTE, 'symbol': 'IBM'}
+
+        now = _at(2021, 11, 5, 17, 0)
+        self.assertEqual(policy.expires_at(quote, now), _at(2021, 11, 8, 9, 30))
+        now = _at(2021, 11, 8, 16, 30)
+        self.assertEqual(policy.expires_at(quote, now), now + 60)
+        self.assertIsNone(calendar.session_for('IBM', now))
+
+        calendar.register([dict(SEARCH_RESULT, **{'7. timezone': 'UTC-05'})], now=now)
+        self.assertEqual(policy.expires_at(quote, now), now + 60)
+        self.assertEqual(calendar.session_for('IBM', now).next_close(now), _at(2021, 11, 8, 17, 0))
+
+    def test_caching_transport_learns_sessions(self):
+        """ Test the search responses going through the cache register the sessions.
+        :return:
+        """
+        transport = CachingTransport(transport=_SearchTransport())
+        url = f'https://www.alphavantage.co/query?function={AlphaVantageFunctions.SEARCH}&keywords=ibm&apikey=KEY'
+        transport.get(url)
+        transport.get(url)
+        self.assertEqual(transport.transport.calls, 1)
+        self.assertIsNotNone(transport.refresh_policy.calendar.session_for('IBM'))
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls._OUTPUT_PATH)
@@ -0,0 +1,127 @@
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from urllib.parse import urlsplit, parse_qs
+
+from alpha_vantage.cache import CachingTransport
+from alpha_vantage.market_session import RefreshPolicy
+from alpha_vantage.prefetch import Prefetcher
+from alpha_vantage.transport import RateLimitedTransport, Response
+from alpha_vantage_runner import AplhaAdvantageRunner
+from helpers.rate_limiter import RateLimiter
+
+
+class _CountingTransport(object):
+    """ Answers every function with a minimal valid result, and counts the requests per function.
+    """
+
+    _RESULTS = {
+        'SYMBOL_SEARCH': {'bestMatches': []},
+        'GLOBAL_QUOTE': {'Global Quote': {'01. symbol': 'IBM', '05. price': '140.00'}},
+        'TIME_SERIES_DAILY': {'Time Series (Daily)': {'2021-08-24': {'4. close': '140.00'}}},
+    }
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get(self, url: str, **kwargs):
+        function = parse_qs(urlsplit(url).query)['function'][0]
+        with self._lock:
+            self.calls.append(function)
+        return Response(content=json.dumps(self._RESULTS[function]).encode('utf-8'))
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class PrefetchTest(unittest.TestCase):
+
+    def setUp(self):
+        self._OUTPUT_PATH = tempfile.mkdtemp()
+        self.upstream = _CountingTransport()
+        self.rate_limiter = RateLimiter(limits=((100, 60),))
+        transport = CachingTransport(transport=RateLimitedTransport(self.rate_limiter, self.upstream),
+                                     refresh_policy=RefreshPolicy())
+        self.prefetcher = Prefetcher(rate_limiter=self.rate_limiter, poll_interval=0.01).start()
+        self.runner = AplhaAdvantageRunner(api_key='KEY', output_dest=self._OUTPUT_PATH, transport=transport,
+                                           prefetcher=self.prefetcher)
+
+    def test_prefetched_actions_hit_the_cache(self):
+        """ Test the quote and daily series fetched after the company selection answer the menu actions,
+        without another upstream request.
+        :return:
+        """
+        self.runner.alpha_vantage
+        self.runner._prefetch(symbol='IBM')
+        self.assertTrue(_wait_for(lambda: len(self.upstream.calls) == 3))
+        self.assertEqual(self.upstream.calls, ['SYMBOL_SEARCH', 'GLOBAL_QUOTE', 'TIME_SERIES_DAILY'])
+
+        self.assertEqual(self.runner._get_quote(symbol='IBM')['05. price'], '140.00')
+        self.assertIn('2021-08-24', self.runner._daily(symbol='IBM'))
+        self.assertEqual(len(self.upstream.calls), 3)
+
+    def test_yields_to_user_requests(self):
+        """ Test no prefetch starts while a user request is in progress, nor when it would use the reserved quota.
+        :return:
+        """
+        done = []
+        with self.prefetcher.user_request():
+            self.prefetcher.schedule([lambda: done.append(1)])
+            time.sleep(0.1)
+            self.assertEqual((done, self.prefetcher.pending), ([], 1))
+        self.assertTrue(_wait_for(lambda: done == [1]))
+
+        rate_limiter = RateLimiter(limits=((2, 60),))
+        prefetcher = Prefetcher(rate_limiter=rate_limiter, reserve=1, poll_interval=0.01).start()
+        try:
+            rate_limiter.try_acquire()
+            prefetcher.schedule([lambda: done.append(2)])
+            time.sleep(0.1)
+            self.assertEqual((done, prefetcher.pending), ([1], 1))
+        finally:
+            prefetcher.stop()
+
+    def test_prepaid_slot(self):
+        """ Test the prefetch slot is checked against the reserve and taken at once, then used by the request
+        instead of taking another one, or given back when unused.
+        :return:
+        """
+        rate_limiter = RateLimiter(limits=((3, 60),))
+        with rate_limiter.prepaid(reserve=1) as acquired:
+            self.assertTrue(acquired)
+            self.assertEqual(rate_limiter.available(), 2)
+            self.assertTrue(rate_limiter.acquire(timeout=0))
+            self.assertEqual(rate_limiter.available(), 2)
+        with rate_limiter.prepaid(reserve=1) as acquired:
+            self.assertTrue(acquired)
+        self.assertEqual(rate_limiter.available(), 2)
+
+        self.assertTrue(rate_limiter.try_acquire(reserve=1))
+        with rate_limiter.prepaid(reserve=1) as acquired:
+            self.assertFalse(acquired)
+        self.assertFalse(rate_limiter.try_acquire(reserve=1))
+        self.assertTrue(rate_limiter.try_acquire())
+
+    def test_stop_does_not_hang(self):
+        """ Test stopping does not wait for a prefetch stuck in a request.
+        :return:
+        """
+        self.prefetcher.schedule([lambda: time.sleep(0.5)])
+        self.assertTrue(_wait_for(lambda: self.prefetcher.pending == 0))
+        started_at = time.monotonic()
+        self.prefetcher.stop(timeout=0.1)
+        self.assertLess(time.monotonic() - started_at, 0.4)
+
+    def tearDown(self) -> None:
+        self.prefetcher.stop()
+        shutil.rmtree(self._OUTPUT_PATH)
@@ -0,0 +1,57 @@
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from alpha_vantage.alpha_vantage import AlphaVantage
+from alpha_vantage_runner import AplhaAdvantageRunner
+from alpha_vantage.transport import Response
+from helpers.profiler import NULL_PROFILER, PHASES, PhaseProfiler
+
+
+class _QuoteTransport(object):
+
+    def get(self, url: str, **kwargs):
+        return Response(content=json.dumps({'Global Quote': {'01. symbol': 'IBM'}}).encode('utf-8'))
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self._OUTPUT_PATH = tempfile.mkdtemp()
+        self.alpha_vantage = AlphaVantage(key='KEY', transport=_QuoteTransport(), validate_key=False)
+
+    def test_profile_phases(self):
+        """ Test the requests made within the block are timed per phase, and the cProfile stats are written.
+        :return:
+        """
+        prof_file = os.path.join(self._OUTPUT_PATH, 'session.prof')
+        with self.alpha_vantage.profile(cprofile_path=prof_file) as profiler:
+            self.alpha_vantage.get_current_quote(symbol='IBM')
+            self.alpha_vantage.get_current_quote(symbol='IBM')
+        self.assertIs(self.alpha_vantage.profiler, NULL_PROFILER)
+
+        summary = profiler.summary()
+        self.assertEqual(tuple(summary.keys()), PHASES)
+        for phase in ('network', 'decode', 'validate'):
+            self.assertEqual(summary[phase]['calls'], 2)
+        self.assertEqual(summary['persist']['calls'], 0)
+        self.assertGreater(profiler.elapsed, 0)
+        self.assertIn('network', profiler.report())
+        self.assertGreater(pstats.Stats(prof_file).total_calls, 0)
+
+    def test_profile_api_key_check(self):
+        """ Test the api key check sent when the runner creates its client is timed as a network call.
+        :return:
+        """
+        profiler = PhaseProfiler()
+        runner = AplhaAdvantageRunner(api_key='KEY', output_dest=self._OUTPUT_PATH, transport=_QuoteTransport(),
+                                      profiler=profiler)
+        runner.alpha_vantage.get_current_quote(symbol='IBM')
+        self.assertIs(runner.alpha_vantage.profiler, profiler)
+        self.assertEqual(profiler.summary()['network']['calls'], 2)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self._OUTPUT_PATH)
@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from alpha_vantage.alpha_vantage import AlphaVantage
+from alpha_vantage.cache import ResponseCache
+from alpha_vantage.proxy import AlphaVantageProxy
+from constants import AlphaVantageFunctions
+from helpers.custom_exceptions_helper import AlphaVantageApiException
+from helpers.rate_limiter import RateLimiter
+
+
+class _MockUpstreamHandler(BaseHTTPRequestHandler):
+    """ Stands for the alpha vantage api, counts the requests it receives.
+    """
+    PAYLOADS = {
+        AlphaVantageFunctions.SEARCH: {'bestMatches': [{'1. symbol': 'IBM', '2. name': 'IBM'}]},
+        AlphaVantageFunctions.CURRENT_QOUTE: {'Global Quote': {'01. symbol': 'IBM', '05. price': '139.8600'}},
+    }
+
+    def do_GET(self):
+        params = parse_qs(urlsplit(self.path).query)
+        with self.server.lock:
+            self.server.requests.append(params)
+        time.sleep(0.1)
+        body = json.dumps(self.PAYLOADS.get(params['function'][0], {'Error Message': 'Invalid API call.'}))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ProxyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.upstream = ThreadingHTTPServer(('127.0.0.1', 0), _MockUpstreamHandler)
+        self.upstream.requests = []
+        self.upstream.lock = threading.Lock()
+        threading.Thread(target=self.upstream.serve_forever, daemon=True).start()
+        upstream_url = 'http://{}:{}'.format(*self.upstream.server_address)
+        self.proxy = AlphaVantageProxy(port=0, upstream_url=upstream_url, api_key='PROXY_KEY',
+                                       rate_limiter=RateLimiter(limits=((3, 60),)), queue_timeout=0).start()
+
+    def test_cache_and_coalescing(self):
+        """ Test clients share one upstream request, whether they ask at the same time or one after the other.
+        :return:
+        """
+        # the client checks its key with a search when it is created
+        alpha_vantage = AlphaVantage(key='CLIENT_KEY', base_url=self.proxy.base_url)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            quotes = list(executor.map(lambda _: alpha_vantage.get_current_quote(symbol='IBM'), range(8)))
+        self.assertTrue(all(quote['05. price'] == '139.8600' for quote in quotes))
+        alpha_vantage.get_current_quote(symbol='IBM')
+
+        self.assertEqual(len(self.upstream.requests), 2)
+        self.assertTrue(all(params['apikey'] == ['PROXY_KEY'] for params in self.upstream.requests))
+        self.assertEqual(self.proxy.stats()['upstream_requests'], 2)
+
+    def test_errors_and_rate_limit(self):
+        """ Test error responses are not cached, and requests over the limit are answered with the usage note.
+        :return:
+        """
+        alpha_vantage = AlphaVantage(key='CLIENT_KEY', base_url=self.proxy.base_url)
+        self.assertRaises(AlphaVantageApiException, alpha_vantage.get_daily_timeseries, symbol='IBM', force_json=True)
+        self.assertRaises(AlphaVantageApiException, alpha_vantage.get_daily_timeseries, symbol='IBM', force_json=True)
+        self.assertEqual(len(self.upstream.requests), 3)
+        # the limit is reached, the next request does not reach the upstream
+        self.assertRaises(AlphaVantageApiException, alpha_vantage.get_current_quote, symbol='IBM')
+        self.assertEqual(len(self.upstream.requests), 3)
+
+    def test_daily_limit_answers_right_away(self):
+        """ Test a request does not wait for a slot freeing up after the queue timeout, e.g. once the daily quota
+        is used.
+        :return:
+        """
+        rate_limiter = RateLimiter(limits=((1, 24 * 60 * 60),))
+        rate_limiter.try_acquire()
+        proxy = AlphaVantageProxy(port=0, upstream_url=self.proxy.upstream_url, rate_limiter=rate_limiter).start()
+        try:
+            start = time.monotonic()
+            status_code, content = proxy.fetch('/query?function=GLOBAL_QUOTE&symbol=IBM&apikey=KEY')
+            self.assertLess(time.monotonic() - start, 1)
+            self.assertEqual(status_code, 200)
+            self.assertIn('Note', json.loads(content))
+            self.assertEqual(self.upstream.requests, [])
+        finally:
+            proxy.shutdown()
+
+    def test_cache_bounds(self):
+        """ Test the cache drops the least recently used entries beyond its size, and sweeps the expired ones.
+        :return:
+        """
+        cache = ResponseCache(max_entries=2, sweep_interval=0)
+        now = time.time()
+        cache.set('a', 1, now + 60)
+        cache.set('b', 2, now + 60)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3, now + 60)
+        self.assertEqual((len(cache), cache.get('b'), cache.get('a')), (2, None, 1))
+
+        cache = ResponseCache(max_entries=None, sweep_interval=60 * 60)
+        cache.set('a', 1, now - 1)
+        cache.set('b', 2, now + 60)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.sweep(), len(cache)), (1, 1))
+        # once the interval is past, storing sweeps every expired entry, not only the one being read
+        cache._entries['b'] = (2, now - 1)
+        cache.sweep_interval = 0
+        cache.set('c', 3, now + 60)
+        self.assertEqual(list(cache._entries.keys()), ['c'])
+
+    def tearDown(self) -> None:
+        self.proxy.shutdown()
+        self.upstream.shutdown()
+        self.upstream.server_close()
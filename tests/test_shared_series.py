@@ -0,0 +1,93 @@
+import os
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Tuple
+
+import numpy as np
+
+from alpha_vantage.shared_series import SharedSeriesRegistry, attach, attach_series, detach, init_worker
+
+RESULT = {
+    '2021-08-24 19:40:00': {'1. open': '221.29', '2. high': '221.29', '3. low': '221.29', '4. close': '221.29',
+                            '5. volume': '100'},
+    '2021-08-24 20:00:00': {'1. open': '221.26', '2. high': '221.26', '3. low': '221.26', '4. close': '221.26',
+                            '5. volume': '1000'},
+}
+
+
+def _close_sum(key: Tuple[str, str]) -> Tuple[float, bool, str]:
+    """ Worker: attach by symbol and interval, read the closes in place.
+    """
+    series = attach_series(*key)
+    return float(series.column('close').sum()), series.values.flags.writeable, str(series.timestamps[-1])
+
+
+def _is_mapped(name: str) -> bool:
+    with open('/proc/self/maps', 'r') as maps:
+        return any(name in line for line in maps)
+
+
+def _attach_and_detach(handle) -> Tuple[bool, bool]:
+    """ Worker: whether the block is mapped after attaching, then after detaching.
+    """
+    series = attach(handle)
+    del series
+    attached = _is_mapped(handle.name)
+    detach(handle)
+    return attached, _is_mapped(handle.name)
+
+
+class SharedSeriesTest(unittest.TestCase):
+
+    def test_publish_and_attach(self):
+        """ Test workers attach by symbol and interval to read only arrays holding the published series.
+        :return:
+        """
+        with SharedSeriesRegistry() as registry:
+            handle = registry.publish_result(symbol='BA', interval='1min', result=RESULT)
+            self.assertEqual(handle.columns, ['open', 'high', 'low', 'close', 'volume'])
+            series = attach(handle)
+            self.assertEqual(series.column('volume').tolist(), [100.0, 1000.0])
+            self.assertRaises(ValueError, series.values.__setitem__, (0, 0), 1.0)
+
+            with ProcessPoolExecutor(max_workers=2, initializer=init_worker, initargs=(registry.handles,)) as executor:
+                results = list(executor.map(_close_sum, [('BA', '1min')] * 4))
+            self.assertEqual(results, [(221.29 + 221.26, False, '2021-08-24T20:00:00')] * 4)
+            del series
+
+        self.assertIsNone(registry.handle('BA', '1min'))
+
+    def test_republish(self):
+        """ Test publishing the same symbol and interval again replaces the series.
+        :return:
+        """
+        with SharedSeriesRegistry() as registry:
+            first = registry.publish('IBM', 'daily', np.array(['2021-04-06'], dtype='datetime64[s]'),
+                                     np.array([[1.0]]), ['close'])
+            second = registry.publish('IBM', 'daily', np.array(['2021-04-06', '2021-04-07'], dtype='datetime64[s]'),
+                                      np.array([[1.0], [2.0]]), ['close'])
+            self.assertNotEqual(first.name, second.name)
+            self.assertEqual(list(registry.handles.keys()), [('IBM', 'daily')])
+            self.assertEqual(attach(second).column('close').tolist(), [1.0, 2.0])
+
+    @unittest.skipUnless(os.path.exists('/proc/self/maps'), 'needs /proc')
+    def test_released_blocks_are_unmapped(self):
+        """ Test neither the publisher nor an attaching process keeps a block mapped once it is released.
+        :return:
+        """
+        names = []
+        for _ in range(3):
+            with SharedSeriesRegistry() as registry:
+                handle = registry.publish_result(symbol='BA', interval='1min', result=RESULT)
+                names.append(handle.name)
+                series = attach(handle)
+                self.assertEqual(series.column('close').tolist(), [221.29, 221.26])
+                del series
+        self.assertFalse(any(_is_mapped(name) for name in names))
+
+        with SharedSeriesRegistry() as registry:
+            handle = registry.publish_result(symbol='BA', interval='1min', result=RESULT)
+            # spawned, so the worker does not inherit the publisher's mapping
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                self.assertEqual(executor.submit(_attach_and_detach, handle).result(), (True, False))
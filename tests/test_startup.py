@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+class StartupTest(unittest.TestCase):
+
+    def test_no_heavy_imports_at_startup(self):
+        """ Test the cli can start and build its runner without importing the network or numeric libraries,
+        and without sending any request.
+        :return:
+        """
+        code = ("import sys, main\n"
+                "from alpha_vantage_runner import AplhaAdvantageRunner\n"
+                "runner = AplhaAdvantageRunner(api_key='KEY', output_dest='.')\n"
+                "print(','.join(m for m in ('requests', 'numpy') if m in sys.modules))\n"
+                "print(runner._alpha_vantage)\n")
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.splitlines(), ['', 'None'])
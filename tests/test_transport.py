@@ -0,0 +1,96 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from urllib.parse import urlsplit, parse_qs
+
+from alpha_vantage.alpha_vantage import AlphaVantage
+from alpha_vantage.transport import RecordingTransport, ReplayTransport, Response
+from constants import AlphaVantageFunctions
+from helpers.custom_exceptions_helper import AlphaVantageApiException
+
+
+class _UpstreamTransport(object):
+    """ Stands for the alpha vantage service, answers from canned payloads.
+    """
+
+    PAYLOADS = {
+        AlphaVantageFunctions.SEARCH: {'bestMatches': [{'1. symbol': 'IBM', '2. name': 'IBM'}]},
+        AlphaVantageFunctions.CURRENT_QOUTE: {'Global Quote': {'01. symbol': 'IBM', '05. price': '139.8600'}},
+    }
+
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url: str, **kwargs):
+        self.urls.append(url)
+        function = parse_qs(urlsplit(url).query)['function'][0]
+        time.sleep(0.05)
+        return Response(content=json.dumps(self.PAYLOADS[function]).encode('utf-8'))
+
+
+class TransportTest(unittest.TestCase):
+
+    def setUp(self):
+        self._OUTPUT_PATH = tempfile.mkdtemp()
+        self._ARCHIVE = os.path.join(self._OUTPUT_PATH, 'session.jsonl.gz')
+
+    def _record(self):
+        """ Record a short session against the canned upstream.
+        :return:
+        """
+        with RecordingTransport(archive_path=self._ARCHIVE, transport=_UpstreamTransport()) as transport:
+            alpha_vantage = AlphaVantage(key='SECRET_KEY', transport=transport)
+            alpha_vantage.search(keyword='ibm')
+            alpha_vantage.get_current_quote(symbol='IBM')
+
+    def test_record_redacts_api_key(self):
+        """ Test the archive keeps the requests, bodies and timings, but not the api key.
+        :return:
+        """
+        self._record()
+        with gzip.open(self._ARCHIVE, 'rt', encoding='utf-8') as reader_file:
+            archive = reader_file.read()
+        self.assertNotIn('SECRET_KEY', archive)
+        entries = [json.loads(line) for line in archive.splitlines()]
+        # the api key check, the search and the quote
+        self.assertEqual(len(entries), 3)
+        self.assertGreater(entries[-1]['duration'], 0)
+        self.assertIn('139.8600', entries[-1]['body'])
+
+    def test_replay(self):
+        """ Test the recorded session can be replayed offline with another key, at the original pace or faster.
+        :return:
+        """
+        self._record()
+        alpha_vantage = AlphaVantage(key='OTHER_KEY', transport=ReplayTransport(archive_path=self._ARCHIVE))
+        self.assertEqual(alpha_vantage.search(keyword='ibm')[0]['1. symbol'], 'IBM')
+        self.assertEqual(alpha_vantage.get_current_quote(symbol='IBM')['05. price'], '139.8600')
+        self.assertRaises(AlphaVantageApiException, alpha_vantage.get_current_quote, symbol='BA')
+
+        paced = ReplayTransport(archive_path=self._ARCHIVE, speed=1.0)
+        started_at = time.monotonic()
+        AlphaVantage(key='OTHER_KEY', transport=paced).get_current_quote(symbol='IBM')
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.1)
+
+    def test_replay_keeps_the_gaps(self):
+        """ Test the paced replay waits for the recorded offset of each request, not only its latency.
+        :return:
+        """
+        with RecordingTransport(archive_path=self._ARCHIVE, transport=_UpstreamTransport()) as transport:
+            alpha_vantage = AlphaVantage(key='SECRET_KEY', transport=transport)
+            time.sleep(0.3)
+            alpha_vantage.get_current_quote(symbol='IBM')
+
+        for speed, least in ((1.0, 0.3), (2.0, 0.15)):
+            alpha_vantage = AlphaVantage(key='OTHER_KEY',
+                                         transport=ReplayTransport(archive_path=self._ARCHIVE, speed=speed))
+            started_at = time.monotonic()
+            alpha_vantage.get_current_quote(symbol='IBM')
+            self.assertGreaterEqual(time.monotonic() - started_at, least)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self._OUTPUT_PATH)